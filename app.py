@@ -1,22 +1,24 @@
 
 import streamlit as st
 import pandas as pd
-import yaml
+import numpy as np
 import os
 from datetime import datetime
 from streamlit_lottie import st_lottie
 
 from engine import (
-    ProcessStep, score_wastes, make_observation, compute_lead_time,
-    build_material_flow_narrative, categorize_theme, get_questionnaire_effects
+    ProcessStep, build_material_flow_narrative, categorize_theme,
+    WASTES, score_wastes_batch, steps_to_columns, StepTable, load_template_bundle,
+    ObservationCache, simulate_lead_time, profile_thresholds, step_version
 )
-from report import export_observations_pptx, export_observations_pdf
+from report import export_observations_pptx, export_observations_pdf, prepare_photo, photo_digest
 
 # ---------- App setup ----------
 st.set_page_config(page_title="OE Assessment Report Generator", layout="wide")
 
-with open("templates.yaml","r", encoding="utf-8") as f:
-    templates = yaml.safe_load(f)
+# Parsed once per process and content hash; the Benchmarks & Rules override is per session
+bundle = load_template_bundle("templates.yaml", override_text=st.session_state.get("templates_override"))
+templates = bundle.templates
 
 # Branding (locked to Kafaa)
 BRAND_PRIMARY = templates.get('brand', {}).get('primary', '#C00000')
@@ -27,12 +29,24 @@ st.image(BRAND_LOGO, width=170)
 st.title("OE Assessment Report Generator")
 profile_key = st.sidebar.selectbox("Industry profile", list(templates.get("profiles",{}).keys()), format_func=lambda k: templates["profiles"][k]["label"] if k in templates.get("profiles",{}) else k)
 st.session_state["profile"] = templates.get("profiles",{}).get(profile_key, {})
+# A profile with its own (calibrated) thresholds block scores with it instead of the global one
+if st.session_state["profile"].get("thresholds"):
+    templates = {**templates, "thresholds": profile_thresholds(templates, profile_key)}
+
+# Insights panels recompute only when the steps (by step_version), templates or inputs change, not on every rerun
+@st.cache_data(max_entries=8, show_spinner=False)
+def _lead_time_sim(step_versions, n_reps, _steps):
+    return simulate_lead_time(_steps, n_reps=n_reps, available_time_sec=8*3600.0, seed=0)
+
+@st.cache_data(max_entries=8, show_spinner=False)
+def _step_waste_scores(step_versions, templates_hash, profile_key, _steps, _templates):
+    return score_wastes_batch(steps_to_columns(_steps), _templates["thresholds"], templates=_templates)["scores"]
 
 # ---------- Sidebar ----------
 with st.sidebar:
     st.title("🧭 Navigation")
     lang = st.selectbox("Language / اللغة", ["en","ar"], index=0, key="lang")
-    nav = st.radio("Go to", ["Welcome","Snapshot","Data Collection","Financial Assessment","Product Selection","VSM Charter","Value Chain","Benchmarks & Rules","Insights & Narratives","Business Case","Export"], index=0, key="nav")
+    nav = st.radio("Go to", ["Welcome","Snapshot","Data Collection","Financial Assessment","Product Selection","VSM Charter","Value Chain","Benchmarks & Rules","Insights & Narratives","Business Case","Kafaa PACE","Export"], index=0, key="nav")
 
     st.markdown("---")
     st.header("⚙️ Global Settings")
@@ -69,7 +83,7 @@ with st.sidebar:
                         "lang": st.session_state.get("lang","en"),
                         "n_steps": st.session_state.get("n_steps",5)
                     },
-                    "steps": [s.__dict__ for s in st.session_state.get("steps",[])],
+                    "steps": StepTable.from_steps(st.session_state.get("steps",[])).to_records(),
                     "vc_summary": st.session_state.get("vc_summary")
                 }
                 path = "oe_snapshot.json"
@@ -86,10 +100,7 @@ with st.sidebar:
                 meta = payload.get("meta",{})
                 for k,v in meta.items():
                     st.session_state[k] = v
-                steps = []
-                for sd in payload.get("steps", []):
-                    steps.append(ProcessStep(**sd))
-                st.session_state["steps"] = steps
+                st.session_state["steps"] = StepTable.from_records(payload.get("steps", []))
                 st.session_state["vc_summary"] = payload.get("vc_summary")
                 st.success("Snapshot loaded. Use the sidebar to navigate.")
 
@@ -127,38 +138,19 @@ _init_state()
 BASIC_COLS = ["id","name","ct_sec","wip_units_in","defect_pct","rework_pct","push_pull","process_type","distance_m","layout_moves","waiting_starved_pct","safety_incidents"]
 
 def steps_to_df(steps):
-    rows = []
-    for s in steps:
-        rows.append({
-            "id": s.id, "name": s.name, "ct_sec": s.ct_sec, "wip_units_in": s.wip_units_in,
-            "defect_pct": s.defect_pct, "rework_pct": s.rework_pct, "push_pull": s.push_pull,
-            "process_type": s.process_type, "distance_m": s.distance_m, "layout_moves": s.layout_moves,
-            "waiting_starved_pct": s.waiting_starved_pct, "safety_incidents": s.safety_incidents
-        })
-    return pd.DataFrame(rows, columns=BASIC_COLS)
+    return StepTable.from_steps(steps).to_df(BASIC_COLS)
 
 def df_to_steps(df, answers_bank=None):
-    out = []
-    answers_bank = answers_bank or {}
-    for _, r in df.iterrows():
-        out.append(ProcessStep(
-            id=str(r["id"]), name=str(r["name"]), ct_sec=float(r.get("ct_sec",0) or 0.0),
-            wip_units_in=float(r.get("wip_units_in",0) or 0.0), defect_pct=float(r.get("defect_pct",0) or 0.0),
-            rework_pct=float(r.get("rework_pct",0) or 0.0), push_pull=str(r.get("push_pull","Push") or "Push"),
-            process_type=str(r.get("process_type","Manual") or "Manual"), distance_m=float(r.get("distance_m",0) or 0.0),
-            layout_moves=int(r.get("layout_moves",0) or 0), waiting_starved_pct=float(r.get("waiting_starved_pct",0) or 0.0),
-            safety_incidents=int(r.get("safety_incidents",0) or 0), answers=answers_bank.get(str(r["id"]), {})
-        ))
-    return out
+    return StepTable.from_df(df, answers_bank=answers_bank)
 
 def ensure_default_steps():
     if not st.session_state["steps"]:
-        st.session_state["steps"] = [
+        st.session_state["steps"] = StepTable.from_steps(
             ProcessStep(id=f"P{i}", name=f"Process {i}", ct_sec=60.0, wip_units_in=20.0, defect_pct=1.5,
                         rework_pct=0.0, push_pull="Push", process_type="Manual", distance_m=10.0,
                         layout_moves=1, waiting_starved_pct=5.0, safety_incidents=0, answers={})
             for i in range(1, int(st.session_state.get('n_steps',5))+1)
-        ]
+        )
 
 # ---------- Pages ----------
 if st.session_state["nav"] == "Welcome":
@@ -244,12 +236,13 @@ elif st.session_state["nav"] == "Snapshot":
                                 saved_paths.append(path)
                             st.session_state["photos"].setdefault((s.id, wkey), [])
                             existing = st.session_state["photos"][(s.id, wkey)]
+                            seen = {photo_digest(p) for p in existing if os.path.exists(p)}
                             for p in saved_paths:
-                                if p not in existing:
-                                    existing.append(p)
+                                if p not in existing and photo_digest(p) not in seen:  # same picture under another name
+                                    existing.append(p); seen.add(photo_digest(p))
                             st.success(f"Saved {len(saved_paths)} file(s).")
                         for p in st.session_state.get("photos", {}).get((s.id, wkey), [])[:3]:
-                            st.image(p, caption=os.path.basename(p), use_column_width=True)
+                            st.image(prepare_photo(p, "thumb"), caption=os.path.basename(p), use_column_width=True)
                 s.answers = ans
 
 
@@ -341,7 +334,7 @@ elif st.session_state["nav"] == "Data Collection":
                     answers={}
                 )
                 steps.append(new)
-            st.session_state["steps"] = steps
+            st.session_state["steps"] = StepTable.from_steps(steps)
             st.success(f"Imported {len(steps)} processes from Excel.")
     # Manual cards (if no Excel or to refine)
     st.markdown("### Manual entry")
@@ -851,7 +844,6 @@ elif st.session_state["nav"] == "Benchmarks & Rules":
     st.subheader("Benchmarks & Follow‑ups — Admin")
     st.caption("Edit the Value Chain questionnaire, benchmarks, follow‑ups, and confidence levels. Changes apply immediately in this session.")
 
-    import yaml as _yaml
     if "templates_text" not in st.session_state:
         with open("templates.yaml","r",encoding="utf-8") as _f:
             st.session_state["templates_text"] = _f.read()
@@ -861,9 +853,9 @@ elif st.session_state["nav"] == "Benchmarks & Rules":
     colA, colB = st.columns([1,1])
     if colA.button("Apply changes", type="primary"):
         try:
-            parsed = _yaml.safe_load(text)
-            st.session_state["templates"] = parsed  # in-memory override
-            templates.update(parsed) if isinstance(templates, dict) else None
+            bundle = load_template_bundle("templates.yaml", override_text=text)  # in-memory override
+            templates = bundle.templates
+            st.session_state["templates_override"] = text
             st.session_state["templates_text"] = text
             st.success("Templates updated for this session. Re-open Value Chain to see changes.")
         except Exception as e:
@@ -872,6 +864,51 @@ elif st.session_state["nav"] == "Benchmarks & Rules":
         pass
     st.info("Tip: To make changes permanent for all users, update templates.yaml in your GitHub repo.")
 
+    with st.expander("Calibrate scoring thresholds from step history (CSV / Parquet)"):
+        st.caption("Rows use the Snapshot field names (defect_pct, waiting_starved_pct, wip_units_in, distance_m, ...) plus a 'profile' column. "
+                   "Each threshold is set to the chosen quantile of the quantity it scales in its profile's history, so a step at that "
+                   "quantile scores 3/5 on that term; the safety threshold becomes the incident count that scores 5.")
+        step_file = st.file_uploader("Step history", type=["csv","parquet"], key="calib-file")
+        q = st.slider("Quantile", 0.5, 0.95, 0.8, 0.05, key="calib-q")
+        if step_file is not None and st.button("Calibrate"):
+            from engine import calibrate_thresholds
+            try:
+                st.session_state["calibrated_thresholds"] = calibrate_thresholds(step_file, templates, q=q, default_profile=profile_key)
+            except Exception as e:
+                st.error(f"Could not read step history: {e}")
+        calib = st.session_state.get("calibrated_thresholds")
+        if calib:
+            import yaml
+            calib_yaml = yaml.safe_dump({"profiles": {p: {"thresholds": th} for p, th in calib.items()}}, sort_keys=True)
+            st.code(calib_yaml, language="yaml")
+            known = [p for p in calib if p in templates.get("profiles",{})]
+            if known and st.button("Apply to this session"):
+                merged = yaml.safe_load(st.session_state["templates_text"]) or {}
+                for p in known:
+                    merged.setdefault("profiles", {}).setdefault(p, {})["thresholds"] = calib[p]
+                text = yaml.safe_dump(merged, allow_unicode=True, sort_keys=False)
+                st.session_state["templates_override"] = text
+                st.session_state["templates_text"] = text
+                st.success(f"Thresholds applied for: {', '.join(known)}. Re-run Insights to re-score.")
+
+    with st.expander("Edge KPI history (CSV / Parquet)"):
+        edge_keys = [m.get("key") for m in templates.get("prioritization",{}).get("edge_metrics",{}).values() if m.get("key")]
+        st.caption("One column per KPI (" + ", ".join(edge_keys) + ") or metric/value columns. Files are read in chunks; each KPI keeps a bounded percentile sketch.")
+        kpi_file = st.file_uploader("KPI extract", type=["csv","parquet"], key="pace-history-file")
+        c1, c2 = st.columns(2)
+        if c1.button("Add to history", disabled=kpi_file is None):
+            from engine import ingest_kpi_history
+            try:
+                st.session_state["pace_history"] = ingest_kpi_history(kpi_file, edge_keys, history=st.session_state.get("pace_history"))
+            except Exception as e:
+                st.error(f"Could not read KPI extract: {e}")
+        if c2.button("Clear history"):
+            st.session_state.pop("pace_history", None)
+        hist = st.session_state.get("pace_history") or {}
+        if hist:
+            st.dataframe(pd.DataFrame([{"kpi": k, "readings": len(sk), "p10": sk.quantile(0.1), "p50": sk.quantile(0.5), "p90": sk.quantile(0.9)}
+                                       for k, sk in hist.items() if len(sk)]), use_container_width=True)
+
 elif st.session_state["nav"] == "Insights & Narratives":
     st.subheader("Generate insights")
     if st.button("Run analysis", type="primary"):
@@ -879,45 +916,13 @@ elif st.session_state["nav"] == "Insights & Narratives":
         if not steps:
             st.warning("Please add steps in Snapshot first.")
             st.stop()
-        result = compute_lead_time(steps, available_time_sec=8*3600.0)
-        st.session_state["result"] = result
-
-        rows = []
-        for s in steps:
-            wres = score_wastes(s, templates["thresholds"], templates=templates)
-            for waste in ["defects","waiting","inventory","overproduction","transportation","motion","overprocessing","talent","safety"]:
-                row = make_observation(s, waste, wres, templates, templates["thresholds"])
-                if row:
-                    rows.append(row)
-        obs = pd.DataFrame(rows)
+        # Only steps edited since the last run are re-scored; the rest come from the per-step cache
+        cache = st.session_state.setdefault("obs_cache", ObservationCache())
+        refreshed = cache.refresh(steps, templates)
+        st.session_state["result"] = refreshed["result"]
+        obs = pd.DataFrame(refreshed["rows"])
         if not obs.empty:
             obs = obs.sort_values(["rpn_pct","score_0_5"], ascending=False).reset_index(drop=True)
-            id_to_step = {s.id:s for s in steps}
-            ev_list=[]; mk_list=[]; tip_list=[]
-            for r in obs.itertuples(index=False):
-                stp = id_to_step.get(getattr(r,'step_id', None), None) or next((s for s in steps if s.name==r.step_name), None)
-                w = r.waste
-                primary = False
-                if stp:
-                    if w=='defects': primary = (stp.defect_pct or 0)>0
-                    elif w=='waiting': primary = (stp.waiting_starved_pct or 0)>0
-                    elif w=='inventory': primary = (stp.wip_units_in or 0)>0
-                    elif w=='transportation': primary = (stp.distance_m or 0)>0 or (stp.layout_moves or 0)>0
-                    elif w=='motion': primary = True if (stp.process_type or 'Manual') else False
-                    elif w=='overprocessing': primary = (stp.rework_pct or 0)>0
-                    elif w=='overproduction': primary = True
-                    elif w=='safety': primary = (stp.safety_incidents or 0)>0
-                dlt,_ = get_questionnaire_effects(stp, templates, w) if stp else (0.0,[])
-                if primary and dlt>0:
-                    ev='Mixed'
-                elif primary:
-                    ev='Measured'
-                else:
-                    ev='Inferred'
-                mk = '●' if ev=='Measured' else ('◐' if ev=='Mixed' else '○')
-                tip = 'Measured: direct metrics' if ev=='Measured' else ('Mixed: metrics + questionnaire' if ev=='Mixed' else 'Inferred: questionnaire/heuristics')
-                ev_list.append(ev); mk_list.append(mk); tip_list.append(tip)
-            obs['evidence'] = ev_list; obs['evidence_marker'] = mk_list; obs['evidence_note'] = tip_list
         st.session_state["obs_df"] = obs
 
         mf = build_material_flow_narrative(steps, templates, factory_name, report_year, est_cost, est_sales)
@@ -933,10 +938,50 @@ elif st.session_state["nav"] == "Insights & Narratives":
             st.metric("Bottleneck CT (sec)", f"{int(res['ct_bottleneck_sec'])}")
         with c3:
             st.metric("Observations", f"{len(st.session_state.get('obs_df', pd.DataFrame()))}")
+        with st.expander("Lead-time variability (Monte Carlo)", expanded=False):
+            st.caption("Samples downtime, waiting and changeovers per step; throughput is units per 8h shift.")
+            reps = st.select_slider("Replications", options=[10_000, 50_000, 100_000, 200_000], value=100_000, key="mc_reps")
+            versions = tuple(step_version(s) for s in st.session_state["steps"])
+            sim = _lead_time_sim(versions, reps, st.session_state["steps"])
+            m1, m2, m3, m4 = st.columns(4)
+            m1.metric("Lead time P50 (sec)", f"{sim['lead_time_sec']['p50']:,.0f}")
+            m2.metric("Lead time P90 (sec)", f"{sim['lead_time_sec']['p90']:,.0f}")
+            m3.metric("Throughput P50", f"{sim['throughput_units']['p50']:,.0f}")
+            m4.metric("Throughput P10", f"{sim['throughput_units']['p10']:,.0f}")
+            share = {sid: f"{v:.0%}" for sid, v in sim["bottleneck_share"].items() if v > 0}
+            st.write({"Bottleneck share": share})
+        with st.expander("Compared with past assessments (corpus percentiles)", expanded=False):
+            from engine import load_assessment_corpus, add_to_corpus
+            corpus = load_assessment_corpus()
+            steps = st.session_state["steps"]
+            step_scores = _step_waste_scores(versions, bundle.content_hash, profile_key, steps, templates)
+            pct = corpus.percentiles(profile_key, step_scores, st.session_state.get("vc_summary"))
+            st.caption(f"{pct['n_sites']} stored assessments for this profile. 100 = more waste than every peer; 50 = typical.")
+            if pct["n_sites"]:
+                st.dataframe(pd.DataFrame({"waste": [w.title() for w in pct["wastes"]], "percentile (worst step)": [round(v) for v in pct["wastes"].values()]}),
+                             use_container_width=True, hide_index=True)
+                if pct["stages"]:
+                    st.dataframe(pd.DataFrame(pct["stages"]).T.round(0), use_container_width=True)
+            if st.button("Add this assessment to the corpus"):
+                add_to_corpus(profile_key, steps, templates, st.session_state.get("vc_summary"),
+                              site_id=f"{st.session_state.get('factory_name','')} {st.session_state.get('report_year','')}".strip())
+                st.success("Assessment stored.")
+        with st.expander("Similar past assessments", expanded=False):
+            from engine import find_similar_factories
+            same_profile = st.checkbox("Same industry profile only", value=True, key="knn-same-profile")
+            k_sim = st.slider("How many", 1, 10, 5, key="knn-k")
+            similar = find_similar_factories(step_scores, st.session_state.get("vc_summary"), k=k_sim,
+                                             profile_key=profile_key if same_profile else None)
+            if not similar:
+                st.info("No stored assessments yet — add this one from the corpus panel above.")
+            else:
+                st.dataframe(pd.DataFrame([{"site": s["site_id"], "profile": s["profile"], "similarity": round(s["similarity"], 3),
+                                            "top wastes": ", ".join(f"{w.title()} ({sc:.1f})" for w, sc in s["top_wastes"])} for s in similar]),
+                             use_container_width=True, hide_index=True)
 
     obs = st.session_state.get("obs_df", pd.DataFrame())
     if not obs.empty:
-        st.dataframe(obs, use_container_width=True)
+        st.dataframe(st.session_state["obs_cache"].with_observation_text(obs, templates), use_container_width=True)
         obs["theme_code"] = obs["waste"].apply(lambda w: categorize_theme(w)[0])
         theme_order = [("P","Production"),("Q","Quality"),("C","Cost"),("D","Delivery"),("S","Safety"),("M","Morale")]
         st.subheader("Narrative by Theme (PQCDSM)")
@@ -947,7 +992,8 @@ elif st.session_state["nav"] == "Insights & Narratives":
             with st.expander(f"{code} — {name}", expanded=False):
                 for idx, r in enumerate(grp.itertuples(index=False), start=1):
                     num = f"{code}-{idx}"
-                    st.markdown(f"**{num}: {r.step_name} — {r.waste.title()}**  \\n{getattr(r,'observation','')}")
+                    text = st.session_state["obs_cache"].observation_text(r.step_id, r.waste, templates)
+                    st.markdown(f"**{num}: {r.step_name} — {r.waste.title()}**  \\n{text}")
 
         st.subheader("Material Flow Narrative")
         st.write(st.session_state.get("material_flow_text",""))
@@ -956,7 +1002,7 @@ elif st.session_state["nav"] == "Insights & Narratives":
 elif st.session_state["nav"] == "Business Case":
     st.subheader("Business Case — quantify potential annual benefit")
     st.caption("Uses your Value Chain results, follow-ups, and the selected industry profile to estimate benefits by waste. Adjust assumptions in templates.yaml → assumptions.")
-    from engine import estimate_business_case
+    from engine import estimate_business_case, estimate_business_case_mc
     vc_summary = st.session_state.get("vc_summary", [])
     vc_fu = st.session_state.get("vc_followups", {})
     savings = estimate_business_case(vc_summary, templates, vc_followups=vc_fu, assumptions=templates.get("assumptions",{}))
@@ -964,6 +1010,126 @@ elif st.session_state["nav"] == "Business Case":
     bw = savings.get("by_waste", {})
     st.write({k: f"{v:,.0f}" for k,v in bw.items()})
     st.metric("Total Estimated Benefit (annual)", f"{savings.get('total',0.0):,.0f}")
+    with st.expander("Uncertainty range (P10 / P50 / P90)"):
+        st.caption("Assumptions drawn ±spread around templates.yaml values; stage severities widen as Value Chain confidence drops.")
+        spread = st.slider("Assumption spread (±%)", 0, 50, 15, 5, key="bc_spread")
+        mc = estimate_business_case_mc(vc_summary, templates, vc_followups=vc_fu, assumptions=templates.get("assumptions",{}),
+                                       n_samples=20000, seed=0, assumption_spread=spread/100.0)
+        st.session_state["savings_mc"] = mc
+        rows = [{"waste": w, **{k: round(v) for k,v in q.items()}} for w,q in list(mc["by_waste"].items()) + [("total", mc["total"])]]
+        st.dataframe(pd.DataFrame(rows)[["waste","p10","p50","p90","mean"]], use_container_width=True)
+    with st.expander("Savings surface — sweep two assumptions"):
+        from engine import business_case_sweep, BUSINESS_CASE_ASSUMPTIONS
+        keys = list(BUSINESS_CASE_ASSUMPTIONS)
+        c1, c2, c3 = st.columns(3)
+        x_key = c1.selectbox("X axis", keys, index=0, key="bc-sweep-x")
+        y_key = c2.selectbox("Lines", [k for k in keys if k != x_key], index=0, key="bc-sweep-y")
+        span = c3.slider("Range (± % of current)", 10, 90, 50, 10, key="bc-sweep-span") / 100.0
+        asm = templates.get("assumptions",{})
+        cur = {k: float(asm.get(k, d)) for k, d in BUSINESS_CASE_ASSUMPTIONS.items()}
+        xs = np.linspace(cur[x_key]*(1-span), cur[x_key]*(1+span), 41)
+        ys = np.linspace(cur[y_key]*(1-span), cur[y_key]*(1+span), 5)
+        sweep = business_case_sweep(vc_summary, templates, vc_followups=vc_fu, assumptions=asm, grid={x_key: xs, y_key: ys})
+        surface = pd.DataFrame(sweep["total"], index=pd.Index(np.round(xs, 2), name=x_key), columns=[f"{y_key}={y:,.2f}" for y in ys])
+        st.line_chart(surface)
+
+elif st.session_state["nav"] == "Kafaa PACE":
+    pace_i18n = templates.get("i18n",{}).get("pace",{})
+    i18n = pace_i18n.get(st.session_state.get("lang","en"), pace_i18n.get("en", {}))
+    st.subheader(i18n.get("title","Kafaa PACE — Prioritization Engine"))
+    st.caption("Present • Advantage • Critical • Edge")
+    prio = templates.get("prioritization",{})
+
+    # Critical
+    st.markdown(f"### {i18n.get('critical','Critical — choose what matters most now')}")
+    cols = st.columns(6)
+    obj_weights = {}
+    labels = i18n.get("objectives",{})
+    if not prio.get("critical_objectives"):
+        st.info("No critical objectives configured (templates.yaml → prioritization.critical_objectives); ranking uses Present, Advantage and Edge only.")
+    for i, obj in enumerate(prio.get("critical_objectives", [])):
+        with cols[i%6]:
+            label = labels.get(obj["id"], obj["name"])
+            obj_weights[obj["id"]] = st.slider(label, 0.0, 2.0, float(obj.get("weight",1.0)), 0.1, key=f"pace-obj-{obj['id']}")
+    st.session_state["pace_objectives"] = obj_weights
+
+    # Present
+    st.markdown(f"### {i18n.get('present','Present — baseline signals')}")
+    vc_summary = st.session_state.get("vc_summary") or []
+    if not vc_summary:
+        st.info("Compute Value Chain priorities first.")
+    for row in vc_summary:
+        st.write(f"**{row['stage_name']}** → " + ", ".join(f"{w.title()} ({sc:.1f})" for w,sc in row.get("top3",[])))
+
+    # Advantage
+    st.markdown(f"### {i18n.get('advantage','Advantage — estimated annual benefit')}")
+    savings = st.session_state.get("savings") or {}
+    if savings:
+        st.write({k: f"{v:,.0f}" for k,v in savings.get("by_waste",{}).items() if v})
+    else:
+        st.info("Open Business Case to estimate benefits.")
+
+    # Measured metrics for Edge (optional)
+    st.markdown("##### Enter measured values (optional) for better percentile matching")
+    em = {}
+    cols2 = st.columns(3)
+    for i2, (w, cfg) in enumerate(prio.get("edge_metrics",{}).items()):
+        with cols2[i2%3]:
+            key = cfg.get("key"); unit = cfg.get("unit","")
+            em[key] = st.number_input(f"{key} ({unit})", value=None, step=0.1, key=f"pace-meas-{key}")
+    st.session_state["pace_measured"] = em
+
+    if any(v is not None for v in em.values()):
+        with st.expander("Which industry profile fits these KPIs?"):
+            from engine import match_profiles
+            pm = match_profiles(templates, em, history=st.session_state.get("pace_history"), current=profile_key)
+            plabel = lambda k: templates["profiles"][k].get("label", k)
+            if pm["best"] and pm["best"] != profile_key:
+                st.info(f"Closest benchmark set: **{plabel(pm['best'])}** (selected: {plabel(profile_key)}).")
+            elif pm["best"]:
+                st.success(f"The selected profile ({plabel(profile_key)}) is the closest benchmark set.")
+            rows = [{"profile": plabel(p), "fit (mean |ln ratio|)": round(pm["fit"][p], 3),
+                     **{f"edge {w}": f"{pm['edge'][p][w]:.2f} ({pm['edge_delta'][p][w]:+.2f})" for w in pm["edge"][p]}} for p in pm["ranking"]]
+            st.dataframe(pd.DataFrame(rows), use_container_width=True, hide_index=True)
+
+    # Identical inputs (any session) reuse the memoized result
+    from engine import compute_pace_cached
+    pace = compute_pace_cached(
+        vc_summary, savings, templates,
+        objective_weights=obj_weights if obj_weights else None,
+        profile_key=profile_key,
+        measured=em,
+        history=st.session_state.get("pace_history")
+    )
+    st.session_state["pace"] = pace
+
+    st.markdown(f"### {i18n.get('edge','Edge — combined priority (top themes)')}")
+    topw = pace.get("top_wastes", [])[:6]
+    st.write([f"{w.title()}" for w,_ in topw])
+    badge = pace.get("badge", {})
+    st.progress(min(1.0, badge.get("tracked",0)/max(1, badge.get("required",4))))
+    st.caption(f"{i18n.get('badge','Kafaa Readiness Badge progress')}: {badge.get('tracked',0)}/{badge.get('required',4)}")
+
+    with st.expander("Sensitivity — what if the objectives were weighted differently?"):
+        from engine import pace_sensitivity
+        levels = st.multiselect("Weight levels per objective", [0.0,0.5,1.0,1.5,2.0], default=[0.5,1.0,1.5,2.0], key="pace-sens-levels")
+        top_n = st.radio("Stable in top", [1,2,3], index=1, horizontal=True, key="pace-sens-top")
+        if not prio.get("critical_objectives"):
+            st.info("Configure critical objectives to run the sensitivity sweep.")
+        elif levels:
+            sens = pace_sensitivity(vc_summary, savings, templates, levels=tuple(sorted(levels)), top_n=top_n,
+                                    profile_key=profile_key, measured=em, history=st.session_state.get("pace_history"))
+            st.caption(f"{len(sens['weights']):,} weight combinations")
+            share = pd.DataFrame({"waste": [w.title() for w in sens["wastes"]], f"share in top {top_n}": [sens["top_share"][w] for w in sens["wastes"]],
+                                  "mean rank": [sens["mean_rank"][w] for w in sens["wastes"]]}).sort_values("mean rank")
+            st.bar_chart(share.set_index("waste")[[f"share in top {top_n}"]])
+            st.dataframe(share, use_container_width=True, hide_index=True)
+            lead = share["waste"].iloc[0].lower()
+            st.markdown(f"**Tornado — {lead.title()} score as each objective sweeps {min(levels)}–{max(levels)}**")
+            torn = pd.DataFrame([{"objective": labels.get(o, o), "low": sens["tornado"][o][lead][0], "high": sens["tornado"][o][lead][1]}
+                                 for o in sens["objectives"]])
+            torn["swing"] = torn["high"] - torn["low"]
+            st.bar_chart(torn.sort_values("swing", ascending=False).set_index("objective")[["swing"]])
 
 elif st.session_state["nav"] == "Export":
     colA, colB = st.columns(2)
@@ -975,15 +1141,17 @@ elif st.session_state["nav"] == "Export":
             if obs_df.empty:
                 st.warning("Generate insights first.")
                 st.stop()
+            obs_df = st.session_state["obs_cache"].with_observation_text(obs_df, templates)
             steps = st.session_state.get("steps", [])
             perstep_top2 = {}
-            for s in steps:
-                w2 = score_wastes(s, templates["thresholds"], templates=templates)
-                ranked = sorted(list(w2["scores"].items()), key=lambda kv: kv[1], reverse=True)
+            batch = score_wastes_batch(steps_to_columns(steps), templates["thresholds"], templates=templates)
+            for s, sc_row in zip(steps, batch["scores"].tolist()):
+                ranked = sorted(zip(WASTES, sc_row), key=lambda kv: kv[1], reverse=True)
                 perstep_top2[s.id] = [(name,score) for name,score in ranked if score>0][:2]
             result = st.session_state.get("result", {"by_step":{}})
             ct_eff_map = {sid: result.get("by_step",{}).get(sid,{}).get("ct_eff_sec",0.0) for sid in result.get("by_step",{}).keys()}
             template_path = None  # use default from templates.yaml
+            bar = st.progress(0.0, text="Writing slides…")
             path = export_observations_pptx(
                 obs_df, "oe_assessment.pptx",
                 steps=steps, perstep_top2=perstep_top2,
@@ -1000,8 +1168,12 @@ elif st.session_state["nav"] == "Export":
                 champion=st.session_state.get('champion'),
                 savings=st.session_state.get('savings'),
                 brand_primary=st.session_state.get('brand_primary',BRAND_PRIMARY),
-                logo_path=st.session_state.get('brand_logo_path',BRAND_LOGO)
+                logo_path=st.session_state.get('brand_logo_path',BRAND_LOGO),
+                chunk_size=100 if len(obs_df) > 200 else None,  # large decks stream detail slides in chunks
+                workers=min(4, os.cpu_count() or 1) if len(obs_df) > 200 else None,  # ...rendered on up to 4 cores
+                progress=lambda done, total: bar.progress(done / max(total, 1), text=f"Writing slides… {done}/{total} observations")
             )
+            bar.empty()
             st.success(f"PPTX created: {path}")
             with open(path, "rb") as f:
                 st.download_button("Download PPTX", f, file_name="OE_Assessment_Report.pptx")
@@ -1011,6 +1183,7 @@ elif st.session_state["nav"] == "Export":
             if obs_df.empty:
                 st.warning("Generate insights first.")
                 st.stop()
+            obs_df = st.session_state["obs_cache"].with_observation_text(obs_df, templates)
             path = export_observations_pdf(
                 obs_df, "oe_assessment.pdf",
                 brand_primary=st.session_state.get('brand_primary',BRAND_PRIMARY),
@@ -0,0 +1,52 @@
+"""Wall time of export_observations_pptx versus process-pool size.
+
+    python -m benchmarks.bench_pptx_parallel --observations 400
+
+Prints seconds and speed-up over the single-process export for 1, 2, 4, ... up to the CPU count.
+"""
+import argparse
+import os
+import tempfile
+import time
+
+import yaml
+
+import report
+from report import export_observations_pptx
+from benchmarks.synthetic import make_factory
+from benchmarks.bench_suite import _perstep_top2
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--steps", type=int, default=200)
+    ap.add_argument("--observations", type=int, default=400)
+    ap.add_argument("--photos", type=int, default=200)
+    ap.add_argument("--chunk-size", type=int, default=50)
+    ap.add_argument("--max-workers", type=int, default=os.cpu_count() or 1)
+    ap.add_argument("--templates", default="templates.yaml")
+    args = ap.parse_args(argv)
+
+    with open(args.templates, "r", encoding="utf-8") as f:
+        templates = yaml.safe_load(f)
+    report.PHOTO_CACHE_DIR = os.path.join(tempfile.gettempdir(), "kafaa_bench_photo_cache")  # keep uploads/ clean
+    fac = make_factory(templates, args.steps, 20, args.observations, args.photos, os.path.join(tempfile.gettempdir(), "kafaa_bench_photos"))
+    kw = dict(steps=fac["steps"], perstep_top2=_perstep_top2(fac), vc_summary=fac["vc_summary"], photos=fac["photos"],
+              i18n=templates.get("i18n", {}), savings=fac["savings"])
+
+    counts = sorted({w for w in (1, 2, 4, 8, 16, 32, 64) if w <= args.max_workers} | {args.max_workers})
+    base = None
+    print(f"{args.observations} observations, chunk {args.chunk_size}, {os.cpu_count()} CPUs")
+    print(f"{'workers':>8} {'seconds':>9} {'speed-up':>9} {'efficiency':>10}")
+    with tempfile.TemporaryDirectory() as d:
+        for w in counts:
+            t0 = time.perf_counter()
+            export_observations_pptx(fac["obs_df"], os.path.join(d, f"bench_{w}.pptx"), workers=w,
+                                     chunk_size=args.chunk_size if w > 1 else None, **kw)
+            dt = time.perf_counter() - t0
+            base = base or dt
+            print(f"{w:>8} {dt:>9.3f} {base/dt:>8.2f}x {base/dt/w:>9.0%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,192 @@
+"""Wall time and peak memory of the engine, PACE and exporters on synthetic factories.
+
+    python -m benchmarks.bench_suite                      # run and compare with benchmarks/baseline.json
+    python -m benchmarks.bench_suite --update-baseline    # run and store the results as the new baseline
+    python -m benchmarks.bench_suite --scales small --cases pace,edge
+
+Each case is warmed up once, timed as the best of --repeat runs, then run once more under tracemalloc for peak memory.
+Exits with status 1 when a case is slower than baseline × --time-tolerance or uses more than
+baseline × --mem-tolerance; timings under --min-seconds and peaks under --min-kib are treated as noise.
+"""
+import argparse
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import yaml
+
+from engine import (score_wastes, make_observation, score_vc_answers, estimate_business_case,
+                    compute_edge_percentiles, compute_pace)
+import report
+from report import export_observations_pptx, export_observations_pdf
+from benchmarks.synthetic import make_factory
+
+# steps, value-chain stages, observations, photos
+SCALES = {
+    "small": (10, 5, 20, 10),
+    "medium": (50, 10, 100, 50),
+    "large": (200, 20, 400, 200),
+}
+BASELINE = os.path.join(os.path.dirname(__file__), "baseline.json")
+
+
+def _score_wastes(f):
+    th = f["templates"].get("thresholds", {})
+    for s in f["steps"]:
+        score_wastes(s, th, f["templates"])
+
+
+def _make_observation(f):
+    tpl = f["templates"]; th = tpl.get("thresholds", {})
+    for s in f["steps"]:
+        wres = score_wastes(s, th, tpl)
+        for w in wres["scores"]:
+            make_observation(s, w, wres, tpl, th)
+
+
+def _score_vc_answers(f):
+    score_vc_answers(f["vc_answers"], f["templates"], vc_confidence=f["vc_confidence"], vc_followups=f["vc_followups"])
+
+
+def _business_case(f):
+    estimate_business_case(f["vc_summary"], f["templates"], vc_followups=f["vc_followups"], assumptions=f["templates"].get("assumptions", {}))
+
+
+def _edge(f):
+    compute_edge_percentiles(f["templates"], profile_key=f["profile_key"], measured=f["measured"], history=f["history"])
+
+
+def _pace(f):
+    compute_pace(f["vc_summary"], f["savings"], f["templates"], profile_key=f["profile_key"], measured=f["measured"], history=f["history"])
+
+
+def _perstep_top2(f):
+    th = f["templates"].get("thresholds", {})
+    out = {}
+    for s in f["steps"]:
+        ranked = sorted(score_wastes(s, th, f["templates"])["scores"].items(), key=lambda kv: kv[1], reverse=True)
+        out[s.id] = [(w, sc) for w, sc in ranked if sc > 0][:2]
+    return out
+
+
+def _export_pptx(f):
+    with tempfile.TemporaryDirectory() as d:
+        export_observations_pptx(f["obs_df"], os.path.join(d, "bench.pptx"), steps=f["steps"], perstep_top2=f["perstep_top2"],
+                                 vc_summary=f["vc_summary"], photos=f["photos"], i18n=f["templates"].get("i18n", {}), savings=f["savings"])
+
+
+def _export_pptx_stream(f):
+    with tempfile.TemporaryDirectory() as d:
+        export_observations_pptx(f["obs_df"], os.path.join(d, "bench.pptx"), steps=f["steps"], perstep_top2=f["perstep_top2"],
+                                 vc_summary=f["vc_summary"], photos=f["photos"], i18n=f["templates"].get("i18n", {}), savings=f["savings"],
+                                 chunk_size=50)
+
+
+def _export_pdf(f):
+    with tempfile.TemporaryDirectory() as d:
+        export_observations_pdf(f["obs_df"], os.path.join(d, "bench.pdf"))
+
+
+CASES = {
+    "score_wastes": _score_wastes,
+    "make_observation": _make_observation,
+    "score_vc_answers": _score_vc_answers,
+    "estimate_business_case": _business_case,
+    "edge": _edge,
+    "pace": _pace,
+    "export_pptx": _export_pptx,
+    "export_pptx_stream": _export_pptx_stream,
+    "export_pdf": _export_pdf,
+}
+
+
+def measure(fn, arg, repeat):
+    """(best wall seconds over repeat runs after one warm-up, peak traced KiB of one run)."""
+    fn(arg)
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter(); fn(arg); best = min(best, time.perf_counter() - t0)
+    tracemalloc.start()
+    try:
+        fn(arg)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return best, peak / 1024.0
+
+
+def compare(results, baseline, time_tol, mem_tol, min_seconds, min_kib):
+    """Regressions as readable lines; cases missing from the baseline are skipped."""
+    out = []
+    for scale, cases in results.items():
+        for case, r in cases.items():
+            b = baseline.get(scale, {}).get(case)
+            if not b:
+                continue
+            if r["seconds"] > max(min_seconds, b["seconds"] * time_tol):
+                out.append(f"{scale}/{case}: {r['seconds']:.4f}s vs baseline {b['seconds']:.4f}s")
+            if r["peak_kib"] > max(min_kib, b["peak_kib"] * mem_tol):
+                out.append(f"{scale}/{case}: peak {r['peak_kib']:.0f} KiB vs baseline {b['peak_kib']:.0f} KiB")
+    return out
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--scales", default=",".join(SCALES))
+    ap.add_argument("--cases", default=",".join(CASES))
+    ap.add_argument("--repeat", type=int, default=3)
+    ap.add_argument("--templates", default="templates.yaml")
+    ap.add_argument("--baseline", default=BASELINE)
+    ap.add_argument("--update-baseline", action="store_true")
+    ap.add_argument("--time-tolerance", type=float, default=1.5)
+    ap.add_argument("--mem-tolerance", type=float, default=1.25)
+    ap.add_argument("--min-seconds", type=float, default=0.005)
+    ap.add_argument("--min-kib", type=float, default=64.0)
+    args = ap.parse_args(argv)
+
+    with open(args.templates, "r", encoding="utf-8") as f:
+        templates = yaml.safe_load(f)
+    report.PHOTO_CACHE_DIR = os.path.join(tempfile.gettempdir(), "kafaa_bench_photo_cache")  # keep uploads/ clean
+    photo_dir = os.path.join(tempfile.gettempdir(), "kafaa_bench_photos")
+    results = {}
+    print(f"{'scale':<8} {'case':<24} {'seconds':>9} {'peak KiB':>10}")
+    for scale in args.scales.split(","):
+        n_steps, n_stages, n_obs, n_photos = SCALES[scale]
+        fac = make_factory(templates, n_steps, n_stages, n_obs, n_photos, photo_dir)
+        fac["perstep_top2"] = _perstep_top2(fac)
+        results[scale] = {}
+        for case in args.cases.split(","):
+            sec, peak = measure(CASES[case], fac, args.repeat)
+            results[scale][case] = {"seconds": round(sec, 6), "peak_kib": round(peak, 1)}
+            print(f"{scale:<8} {case:<24} {sec:>9.4f} {peak:>10.0f}")
+
+    if args.update_baseline:
+        base = {}
+        if os.path.exists(args.baseline):
+            with open(args.baseline, "r", encoding="utf-8") as f:
+                base = json.load(f)
+        for scale, cases in results.items():
+            base.setdefault(scale, {}).update(cases)
+        base["_meta"] = {"python": platform.python_version(), "machine": platform.machine(), "cpus": os.cpu_count()}
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump(base, f, indent=2, sort_keys=True)
+        print(f"baseline written to {args.baseline}")
+        return 0
+    if not os.path.exists(args.baseline):
+        print("no baseline; run with --update-baseline first")
+        return 0
+    with open(args.baseline, "r", encoding="utf-8") as f:
+        baseline = json.load(f)
+    regressions = compare(results, baseline, args.time_tolerance, args.mem_tolerance, args.min_seconds, args.min_kib)
+    for line in regressions:
+        print("REGRESSION", line)
+    print("no regressions" if not regressions else f"{len(regressions)} regression(s)")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,44 @@
+"""Throughput of score_vc_answers_batch versus process-pool size.
+
+    python -m benchmarks.bench_vc_batch --sites 20000
+
+Prints sites/second and speed-up over one worker for 1, 2, 4, ... up to the CPU count.
+"""
+import argparse
+import os
+import time
+
+import yaml
+
+from engine import score_vc_answers_batch
+from benchmarks.synthetic import make_vc_sites
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--sites", type=int, default=20000)
+    ap.add_argument("--chunk-size", type=int, default=256)
+    ap.add_argument("--max-workers", type=int, default=os.cpu_count() or 1)
+    ap.add_argument("--templates", default="templates.yaml")
+    args = ap.parse_args(argv)
+
+    with open(args.templates, "r", encoding="utf-8") as f:
+        templates = yaml.safe_load(f)
+    sites = make_vc_sites(templates, args.sites)
+    answers = [a for a, _, _ in sites]; confs = [c for _, c, _ in sites]; fus = [f for _, _, f in sites]
+
+    counts = sorted({w for w in (1, 2, 4, 8, 16, 32, 64) if w <= args.max_workers} | {args.max_workers})
+    base = None
+    print(f"{args.sites} sites, chunk {args.chunk_size}, {os.cpu_count()} CPUs")
+    print(f"{'workers':>8} {'seconds':>9} {'sites/s':>10} {'speed-up':>9} {'efficiency':>10}")
+    for w in counts:
+        t0 = time.perf_counter()
+        out = score_vc_answers_batch(answers, templates, vc_confidences=confs, vc_followups=fus, workers=w, chunk_size=args.chunk_size)
+        dt = time.perf_counter() - t0
+        assert len(out) == len(sites)
+        base = base or dt
+        print(f"{w:>8} {dt:>9.3f} {args.sites/dt:>10.0f} {base/dt:>8.2f}x {base/dt/w:>9.0%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+"""Regression check: process-pool paths under a Streamlit-like __main__.
+
+    python -m benchmarks.check_pools
+
+`streamlit run app.py` makes app.py the __main__ module; spawn/forkserver workers that import it die on
+st.session_state and the pool raises BrokenProcessPool. This runs score_vc_answers_batch and the parallel
+PPTX export with __main__ pointing at a script that raises on import, and compares them with the serial
+results. Exits with status 1 on a failure or a mismatch.
+"""
+import os
+import sys
+import tempfile
+import types
+
+import yaml
+
+import report
+from engine import score_vc_answers_batch
+from report import export_observations_pptx
+from benchmarks.synthetic import make_factory, make_vc_sites
+from benchmarks.bench_suite import _perstep_top2
+
+
+def _deck_signature(path):
+    from pptx import Presentation
+    from lxml import etree
+    return [(s.slide_layout.name, etree.tostring(s._element)) for s in Presentation(path).slides]
+
+
+def main(argv=None):
+    with open("templates.yaml", "r", encoding="utf-8") as f:
+        templates = yaml.safe_load(f)
+    report.PHOTO_CACHE_DIR = os.path.join(tempfile.gettempdir(), "kafaa_bench_photo_cache")  # keep uploads/ clean
+    fac = make_factory(templates, 50, 10, 250, 20, os.path.join(tempfile.gettempdir(), "kafaa_bench_photos"))
+    kw = dict(steps=fac["steps"], perstep_top2=_perstep_top2(fac), vc_summary=fac["vc_summary"], photos=fac["photos"],
+              i18n=templates.get("i18n", {}), savings=fac["savings"])
+    sites = make_vc_sites(templates, 64)
+    answers = [a for a, _, _ in sites]
+
+    failures = []
+    with tempfile.TemporaryDirectory() as d:
+        serial_vc = score_vc_answers_batch(answers, templates, workers=1, chunk_size=16)
+        serial = os.path.join(d, "serial.pptx")
+        export_observations_pptx(fac["obs_df"], serial, **kw)
+
+        app = os.path.join(d, "app.py")
+        with open(app, "w", encoding="utf-8") as f:
+            f.write("raise KeyError('st.session_state has no key \"nav\"')\n")
+        fake_main = types.ModuleType("__main__"); fake_main.__file__ = app
+        main_mod, sys.modules["__main__"] = sys.modules["__main__"], fake_main
+        try:
+            for name, run in (("score_vc_answers_batch", lambda: score_vc_answers_batch(answers, templates, workers=2, chunk_size=16) == serial_vc),
+                              ("export_observations_pptx", lambda: export_observations_pptx(fac["obs_df"], os.path.join(d, "par.pptx"),
+                                                                                           chunk_size=100, workers=2, **kw)
+                                                                   and _deck_signature(os.path.join(d, "par.pptx")) == _deck_signature(serial))):
+                try:
+                    ok = run()
+                except Exception as e:
+                    ok = False; print(f"{name}: {type(e).__name__}: {e}")
+                print(f"{name:<26} {'ok' if ok else 'FAILED'}")
+                if not ok:
+                    failures.append(name)
+        finally:
+            sys.modules["__main__"] = main_mod
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,125 @@
+"""Synthetic assessment generators for the benchmarks (seeded; only make_photos writes files)."""
+import os
+import random
+
+
+def make_vc_sites(templates, n, seed=0):
+    """n value-chain assessments shaped like the Value Chain page output:
+    (vc_answers, vc_confidence, vc_followups) with one answer per configured question."""
+    R = random.Random(seed)
+    qmap = (templates.get("value_chain", {}) or {}).get("questions", {}) or {}
+    levels = [l["factor"] for l in templates.get("value_chain", {}).get("confidence", {}).get("levels", [])] or [1.0]
+    sites = []
+    for _ in range(n):
+        ans, conf, fu = {}, {}, {}
+        for stage, qs in qmap.items():
+            ans[stage] = {}; conf[stage] = {}; fu[stage] = {}
+            for q in qs:
+                scores = [c.get("score", 0) for c in q.get("choices", []) if isinstance(c, dict)] or [0]
+                sc = float(R.choice(scores))
+                ans[stage][q["id"]] = sc
+                conf[stage][q["id"]] = R.choice(levels)
+                trig = (q.get("followups") or {}).get("trigger_score")
+                if trig is not None and sc >= float(trig):
+                    fu[stage][q["id"]] = {item["id"]: "x" for item in q["followups"].get("items", [])}
+        sites.append((ans, conf, fu))
+    return sites
+
+
+# Objective weights for the PACE benchmark cases only: synthetic load, not product scoring config
+SYNTHETIC_PRIORITIZATION = {
+    "critical_objectives": [{"id": o, "name": o, "weight": 1.0} for o in ("prod", "qual", "cost", "delv", "safe", "mora")],
+    "objective_to_waste": {
+        "prod": {"overproduction": 1.0, "overprocessing": 0.5, "motion": 0.5, "transportation": 0.5, "waiting": 0.5},
+        "qual": {"defects": 1.0, "overprocessing": 0.5},
+        "cost": {"inventory": 1.0, "defects": 0.5, "overproduction": 0.5, "transportation": 0.5},
+        "delv": {"waiting": 1.0, "inventory": 0.5, "transportation": 0.5},
+        "safe": {"safety": 1.0, "motion": 0.5},
+        "mora": {"talent": 1.0, "safety": 0.5, "motion": 0.5},
+    },
+}
+
+
+def make_vc_templates(templates, n_stages):
+    """Copy of templates whose value chain has exactly n_stages stages (configured stages cycled, with a suffix)."""
+    vc = dict(templates.get("value_chain", {}) or {})
+    base = list((vc.get("questions") or {}).items())
+    names = {st["id"]: st["name"] for st in vc.get("stages", [])}
+    questions, stages = {}, []
+    for i in range(n_stages):
+        stage, qs = base[i % len(base)]
+        sid = stage if i < len(base) else f"{stage}_{i // len(base) + 1}"
+        questions[sid] = qs
+        stages.append({"id": sid, "name": names.get(stage, stage) + ("" if sid == stage else f" #{i // len(base) + 1}")})
+    vc["questions"] = questions; vc["stages"] = stages
+    return dict(templates, value_chain=vc)
+
+
+def make_steps(n, seed=0):
+    """n ProcessStep rows with realistic ranges and some questionnaire answers."""
+    from engine import ProcessStep
+    R = random.Random(seed)
+    steps = []
+    for i in range(1, n + 1):
+        ans = {}
+        if R.random() < 0.4:
+            ans["defects"] = {"trend": R.choice(["Rising", "Stable", "Falling"])}
+        if R.random() < 0.4:
+            ans["waiting"] = {"frequency": R.choice(["Frequent", "Occasional", "Rare"])}
+        steps.append(ProcessStep(
+            id=f"P{i}", name=f"Process {i}", ct_sec=R.uniform(20, 400), wip_units_in=R.uniform(0, 400),
+            defect_pct=R.uniform(0, 8), rework_pct=R.uniform(0, 6), push_pull=R.choice(["Push", "Pull"]),
+            process_type=R.choice(["Manual", "Semi-auto", "Auto"]), distance_m=R.uniform(0, 120),
+            layout_moves=R.randint(0, 6), waiting_starved_pct=R.uniform(0, 30), safety_incidents=R.randint(0, 3),
+            downtime_pct=R.uniform(0, 15), changeover_freq=R.uniform(0, 4), changeover_time_min=R.uniform(0, 90),
+            operators_n=float(R.randint(1, 8)), touchpoints_n=float(R.randint(0, 10)), answers=ans))
+    return steps
+
+
+def make_photos(keys, n, out_dir, seed=0, size=(1600, 1200)):
+    """n JPEG files under out_dir spread over the (step_id, waste) keys: {key: [paths]} like session_state["photos"]."""
+    from PIL import Image
+    R = random.Random(seed)
+    os.makedirs(out_dir, exist_ok=True)
+    photos = {}
+    for i in range(n if keys else 0):
+        path = os.path.join(out_dir, f"photo_{i}.jpg")
+        if not os.path.exists(path):
+            Image.new("RGB", size, tuple(R.randrange(256) for _ in range(3))).save(path, quality=85)
+        photos.setdefault(keys[i % len(keys)], []).append(path)
+    return photos
+
+
+def make_factory(templates, n_steps, n_stages, n_obs, n_photos, photo_dir, seed=0):
+    """One synthetic assessment shaped like the app's session state: steps, value-chain inputs and summary,
+    observation table (top n_obs by RPN), photos, business-case savings and PACE measured/history inputs.
+    PACE objectives come from SYNTHETIC_PRIORITIZATION unless the templates configure their own."""
+    import pandas as pd
+    from engine import score_wastes, make_observation, score_vc_answers, estimate_business_case
+    R = random.Random(seed)
+    tpl = make_vc_templates(templates, n_stages)
+    tpl["prioritization"] = dict(SYNTHETIC_PRIORITIZATION, **(tpl.get("prioritization") or {}))
+    th = tpl.get("thresholds", {})
+    steps = make_steps(n_steps, seed)
+    rows = []
+    for s in steps:
+        wres = score_wastes(s, th, tpl)
+        for w in wres["scores"]:
+            o = make_observation(s, w, wres, tpl, th)
+            if o:
+                rows.append(o)
+    obs_df = pd.DataFrame(rows).sort_values(["rpn_pct", "score_0_5"], ascending=[False, False]).head(n_obs).reset_index(drop=True)
+    ans, conf, fu = make_vc_sites(tpl, 1, seed)[0]
+    out = score_vc_answers(ans, tpl, vc_confidence=conf, vc_followups=fu)
+    vc_summary = [{"stage_name": st["name"], "top3": [(w, sc) for w, sc in out[st["id"]]["ranked"][:3] if sc > 0],
+                   "issues": out[st["id"]]["issues"], "confidence": out[st["id"]]["confidence"]} for st in tpl["value_chain"]["stages"]]
+    savings = estimate_business_case(vc_summary, tpl, assumptions=tpl.get("assumptions", {}))
+    keys = [(str(r.step_id), str(r.waste).lower()) for r in obs_df.itertuples(index=False)]
+    metrics = (tpl.get("prioritization", {}) or {}).get("edge_metrics", {}) or {}
+    bm = next(iter((tpl.get("profiles") or {}).values()), {}).get("benchmarks", {})
+    measured = {m["key"]: bm.get(m["key"], 1.0) * R.uniform(0.6, 1.6) for m in metrics.values()}
+    history = {k: [v * R.uniform(0.7, 1.3) for _ in range(50)] for k, v in measured.items()}
+    return {"templates": tpl, "steps": steps, "obs_df": obs_df, "vc_answers": ans, "vc_confidence": conf,
+            "vc_followups": fu, "vc_summary": vc_summary, "savings": savings,
+            "photos": make_photos(keys, n_photos, photo_dir, seed), "profile_key": next(iter(tpl.get("profiles") or {}), None),
+            "measured": measured, "history": history}
@@ -1,6 +1,12 @@
 
-from dataclasses import dataclass
-from typing import Dict, Any, Tuple, List
+import math
+import os
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass, fields
+from typing import Dict, Any, Tuple, List, Mapping
+
+import numpy as np
 
 @dataclass
 class ProcessStep:
@@ -68,11 +74,242 @@ def score_wastes(step: ProcessStep, th: Dict[str,Any], templates: Dict[str,Any])
     for k in scores: scores[k] = max(0.0, min(5.0, scores[k]))
     return {"scores": scores, "deltas": deltas}
 
-def make_observation(step: ProcessStep, waste: str, waste_result: Dict[str,Any], templates: Dict[str,Any], th: Dict[str,Any]) -> Dict[str,Any]:
+# Column order of the batch score matrix (same order as the score_wastes dict)
+WASTES = ("defects","waiting","inventory","transportation","motion","overprocessing","overproduction","talent","safety")
+
+_NUMERIC_STEP_FIELDS = ("ct_sec","wip_units_in","defect_pct","rework_pct","distance_m","layout_moves","waiting_starved_pct",
+                        "safety_incidents","downtime_pct","changeover_freq","changeover_time_min","operators_n","touchpoints_n")
+_DEFECT_TREND_DELTA = {"Rising": 1.0, "Stable": 0.3, "Falling": -0.2}
+_WAITING_FREQ_DELTA = {"Frequent": 1.0, "Occasional": 0.5, "Rare": 0.1}
+
+def steps_to_columns(steps: List[ProcessStep]) -> Dict[str,Any]:
+    """Column-oriented block for score_wastes_batch from a list of ProcessStep (or a StepTable)."""
+    if isinstance(steps, StepTable):
+        return steps.columns()
+    cols = {f: [getattr(s, f) for s in steps] for f in _NUMERIC_STEP_FIELDS}
+    cols["push_pull"] = [s.push_pull for s in steps]
+    cols["process_type"] = [s.process_type for s in steps]
+    cols["answers"] = [s.answers for s in steps]
+    return cols
+
+def _num_col(cols, name, n):
+    v = cols.get(name)
+    if v is None:
+        return np.zeros(n)
+    a = np.asarray(v)
+    if a.dtype == object:
+        # mirror the scalar `(x or 0)` on None entries
+        a = np.array([x or 0 for x in a], dtype=float)
+    return a.astype(float, copy=False)
+
+def score_wastes_batch(cols: Dict[str,Any], th: Dict[str,Any], templates: Dict[str,Any]=None) -> Dict[str,Any]:
+    """Vectorized score_wastes over a column block (dict of equal-length columns or a DataFrame).
+    Numeric columns use the ProcessStep field names; 'push_pull'/'process_type' hold strings and
+    'answers' holds the per-step questionnaire dicts. Missing columns take the ProcessStep defaults.
+    Returns {"wastes": WASTES, "scores": (n×9) array, "deltas": (n×9) array}, identical to score_wastes row by row.
+    """
+    n = len(cols) if hasattr(cols, "columns") else max((len(v) for v in cols.values()), default=0)
+    c = {f: _num_col(cols, f, n) for f in _NUMERIC_STEP_FIELDS}
+    push = cols.get("push_pull"); ptype = cols.get("process_type"); answers = cols.get("answers")
+    is_push = np.ones(n, dtype=bool) if push is None else np.array([(p or "Push") == "Push" for p in push], dtype=bool)
+    is_manual = np.ones(n, dtype=bool) if ptype is None else np.array([(p or "Manual") == "Manual" for p in ptype], dtype=bool)
+
+    # questionnaire effects (same rules as get_questionnaire_effects)
+    d_def = np.zeros(n); d_wait = np.zeros(n); talent = np.zeros(n, dtype=bool)
+    if answers is not None:
+        for i, ans in enumerate(answers):
+            if not ans: continue
+            d_def[i] = _DEFECT_TREND_DELTA.get((ans.get("defects") or {}).get("trend"), 0.0)
+            d_wait[i] = _WAITING_FREQ_DELTA.get((ans.get("waiting") or {}).get("frequency"), 0.0)
+            talent[i] = bool(ans.get("talent"))
+
+    S = np.empty((n, len(WASTES)))
+    with np.errstate(divide="ignore", invalid="ignore"):
+        S[:,0] = np.where(c["defect_pct"] != 0, np.minimum(5.0, c["defect_pct"]/(th.get("defects_pct_high",3.0)/3)), 0.0)
+        S[:,1] = np.minimum(5.0, (c["waiting_starved_pct"] + c["downtime_pct"]/2) / (th.get("waiting_pct_high",10.0)/3))
+        S[:,2] = np.minimum(5.0, c["wip_units_in"]/(th.get("inventory_wip_high",30.0)/3))
+        S[:,3] = np.minimum(5.0, (c["distance_m"] + c["layout_moves"]*10 + c["touchpoints_n"]*5) / (th.get("transport_distance_high_m",30.0)/3))
+        S[:,4] = np.minimum(5.0, c["touchpoints_n"]/(th.get("touchpoints_high",6.0)/3)) + np.where(is_manual, 1.0, 0.3)
+        S[:,5] = np.minimum(5.0, (c["rework_pct"] + c["changeover_time_min"]/th.get('changeover_time_high_min',30.0)) / (th.get("rework_pct_high",2.0)/3))
+    S[:,6] = np.where(is_push, 2.0, 0.5)
+    S[:,7] = np.where(talent, 1.0, 0.5)
+    inc = c["safety_incidents"]
+    S[:,8] = np.where(inc >= th.get("safety_incidents_high",1), 5.0, np.where(inc > 0, 1.0, 0.2))
+
+    D = np.zeros_like(S)
+    D[:,0] = d_def; D[:,1] = d_wait
+    S += D
+    np.clip(S, 0.0, 5.0, out=S)
+    return {"wastes": WASTES, "scores": S, "deltas": D}
+
+# ---------- Columnar step store ----------
+STEP_FIELDS = tuple(f.name for f in fields(ProcessStep))
+_STEP_DEFAULTS = {f.name: f.default for f in fields(ProcessStep)}
+_INT_STEP_FIELDS = ("layout_moves","safety_incidents")
+_CAT_STEP_FIELDS = ("push_pull","process_type")
+
+class StepView:
+    """Row view into a StepTable. Reads and writes go to the table columns, so it can stand in
+    for a ProcessStep wherever steps are only read or edited field by field."""
+    __slots__ = ("_table","_i")
+
+    def __init__(self, table, i):
+        self._table = table; self._i = i
+
+    def to_step(self) -> ProcessStep:
+        return ProcessStep(**{f: getattr(self, f) for f in STEP_FIELDS})
+
+    def __repr__(self):
+        return f"StepView({self.id!r}, {self.name!r})"
+
+def _view_property(name):
+    if name in _CAT_STEP_FIELDS:
+        def get(self): return self._table._cats[name][self._table._cols[name][self._i]]
+        def put(self, v): self._table._cols[name][self._i] = self._table._code(name, v)
+    elif name in _INT_STEP_FIELDS:
+        def get(self): return int(self._table._cols[name][self._i])
+        def put(self, v): self._table._cols[name][self._i] = v or 0
+    elif name in _NUMERIC_STEP_FIELDS:
+        def get(self): return float(self._table._cols[name][self._i])
+        def put(self, v): self._table._cols[name][self._i] = v or 0.0
+    else:
+        def get(self): return self._table._cols[name][self._i]
+        def put(self, v): self._table._cols[name][self._i] = v
+    return property(get, put)
+
+for _f in STEP_FIELDS:
+    setattr(StepView, _f, _view_property(_f))
+
+class StepTable:
+    """Struct-of-arrays store for process steps.
+    Numeric fields are typed NumPy columns, push_pull/process_type are small category codes,
+    id/name/answers are object columns (empty answers are stored as None). Indexing returns a StepView.
+    """
+    __slots__ = ("_cols","_cats","_n")
+
+    def __init__(self, n: int = 0):
+        self._n = int(n)
+        self._cols = {}
+        self._cats = {f: [] for f in _CAT_STEP_FIELDS}
+        for f in STEP_FIELDS:
+            if f in _INT_STEP_FIELDS:
+                self._cols[f] = np.zeros(self._n, dtype=np.int64)
+            elif f in _NUMERIC_STEP_FIELDS:
+                self._cols[f] = np.zeros(self._n, dtype=np.float64)
+            elif f in _CAT_STEP_FIELDS:
+                self._cols[f] = np.zeros(self._n, dtype=np.int8)
+            else:
+                self._cols[f] = np.empty(self._n, dtype=object)
+
+    def _code(self, name, value):
+        cats = self._cats[name]
+        value = value if value else _STEP_DEFAULTS[name]
+        if value not in cats:
+            cats.append(value)
+        return cats.index(value)
+
+    def _set_cat(self, name, values):
+        uniq, inv = np.unique(np.asarray(values, dtype=object).astype(str), return_inverse=True)
+        self._cats[name] = [str(u) for u in uniq]
+        self._cols[name] = inv.astype(np.int8)
+
+    @classmethod
+    def from_steps(cls, steps) -> "StepTable":
+        """Build from ProcessStep objects (or anything with the same attributes, e.g. StepViews)."""
+        if isinstance(steps, StepTable):
+            return steps
+        steps = list(steps)
+        t = cls(len(steps))
+        for f in _NUMERIC_STEP_FIELDS:
+            t._cols[f][:] = [getattr(s, f) or 0 for s in steps]
+        for f in _CAT_STEP_FIELDS:
+            t._set_cat(f, [getattr(s, f) or _STEP_DEFAULTS[f] for s in steps])
+        t._cols["id"][:] = [s.id for s in steps]
+        t._cols["name"][:] = [s.name for s in steps]
+        t._cols["answers"][:] = [s.answers or None for s in steps]
+        return t
+
+    @classmethod
+    def from_records(cls, records) -> "StepTable":
+        """Build from ProcessStep-shaped dicts, e.g. the 'steps' list of a snapshot JSON."""
+        return cls.from_steps(ProcessStep(**r) for r in records)
+
+    @classmethod
+    def from_df(cls, df, answers_bank=None) -> "StepTable":
+        """Columnar equivalent of app.df_to_steps: same coercions, answers looked up by step id."""
+        answers_bank = answers_bank or {}
+        t = cls(len(df))
+        for f in _NUMERIC_STEP_FIELDS:
+            if f not in df.columns: continue
+            a = df[f].to_numpy()
+            if a.dtype == object:
+                a = np.array([x or 0 for x in a], dtype=float)
+            if f in _INT_STEP_FIELDS:
+                a = np.nan_to_num(np.asarray(a, dtype=float))
+            t._cols[f][:] = a
+        for f in _CAT_STEP_FIELDS:
+            vals = df[f].tolist() if f in df.columns else [None]*len(df)
+            t._set_cat(f, [v or _STEP_DEFAULTS[f] for v in vals])
+        t._cols["id"][:] = [str(v) for v in df["id"].tolist()]
+        t._cols["name"][:] = [str(v) for v in df["name"].tolist()]
+        t._cols["answers"][:] = [answers_bank.get(sid) or None for sid in t._cols["id"]]
+        return t
+
+    def to_df(self, columns=None):
+        """DataFrame in the steps_to_df layout (all fields except answers unless columns is given)."""
+        import pandas as pd
+        columns = list(columns or [f for f in STEP_FIELDS if f != "answers"])
+        data = {}
+        for f in columns:
+            if f in _CAT_STEP_FIELDS:
+                data[f] = np.asarray(self._cats[f], dtype=object)[self._cols[f]] if self._n else []
+            else:
+                data[f] = self._cols[f]
+        return pd.DataFrame(data, columns=columns)
+
+    def to_steps(self) -> List[ProcessStep]:
+        return [v.to_step() for v in self]
+
+    def to_records(self) -> List[Dict[str,Any]]:
+        """Snapshot-JSON rows, same shape as ProcessStep.__dict__."""
+        return [{f: getattr(v, f) for f in STEP_FIELDS} for v in self]
+
+    def columns(self) -> Dict[str,Any]:
+        """Column block for score_wastes_batch (no copies of the numeric columns)."""
+        cols = {f: self._cols[f] for f in _NUMERIC_STEP_FIELDS}
+        for f in _CAT_STEP_FIELDS:
+            cols[f] = np.asarray(self._cats[f], dtype=object)[self._cols[f]] if self._n else []
+        cols["id"] = self._cols["id"]; cols["answers"] = self._cols["answers"]
+        return cols
+
+    @property
+    def nbytes(self) -> int:
+        return sum(c.nbytes for c in self._cols.values())
+
+    def __len__(self):
+        return self._n
+
+    def __iter__(self):
+        return (StepView(self, i) for i in range(self._n))
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [StepView(self, j) for j in range(*i.indices(self._n))]
+        if i < 0: i += self._n
+        if not 0 <= i < self._n:
+            raise IndexError(i)
+        return StepView(self, i)
+
+def observation_record(step: ProcessStep, waste: str, waste_result: Dict[str,Any]) -> Dict[str,Any]:
+    """Numeric part of an observation (score, RPN, confidence); {} when the waste scored 0."""
     sc = waste_result["scores"].get(waste, 0.0)
     if sc <= 0.0: return {}
     rpn_pct = min(100.0, sc/5.0*100.0)
     confidence = "High" if sc>=4.0 else ("Medium" if sc>=2.0 else "Low")
+    return {"step_id": step.id,"step_name": step.name,"waste": waste,"score_0_5": sc,"rpn_pct": rpn_pct,"confidence": confidence}
+
+def render_observation(step: ProcessStep, waste: str, sc: float, templates: Dict[str,Any]) -> str:
+    """Narrative text of an observation with score sc."""
     parts = []
     parts.append(f"At {step.name} ({step.id}), {waste} was detected with score {sc:.1f}.")
     if waste == "defects": parts.append(f"Defect {step.defect_pct:.1f}%, rework {step.rework_pct:.1f}%.")
@@ -85,19 +322,185 @@ def make_observation(step: ProcessStep, waste: str, waste_result: Dict[str,Any],
     if waste == "safety": parts.append(f"Incidents: {step.safety_incidents}.")
     dlt, snippets = get_questionnaire_effects(step, templates, waste)
     if snippets: parts.append('; '.join(snippets))
-    obs = ' '.join(parts)
-    return {"step_id": step.id,"step_name": step.name,"waste": waste,"score_0_5": sc,"rpn_pct": rpn_pct,"confidence": confidence,"observation": obs}
+    return ' '.join(parts)
+
+def make_observation(step: ProcessStep, waste: str, waste_result: Dict[str,Any], templates: Dict[str,Any], th: Dict[str,Any]) -> Dict[str,Any]:
+    rec = observation_record(step, waste, waste_result)
+    if not rec: return {}
+    rec["observation"] = render_observation(step, waste, rec["score_0_5"], templates)
+    return rec
+
+def _effective_ct(s) -> float:
+    availability = max(0.2, 1.0 - (s.downtime_pct or 0.0)/100.0)
+    return max(0.0, (s.ct_sec or 0.0) * (1.0 + (s.waiting_starved_pct or 0.0)/100.0)) / availability
 
 def compute_lead_time(steps: List[ProcessStep], available_time_sec: float = 8*3600.0) -> Dict[str,Any]:
     lt = 0.0; by_step = {}; bottleneck=0.0
     for s in steps:
-        availability = max(0.2, 1.0 - (s.downtime_pct or 0.0)/100.0)
-        ct_eff = max(0.0, (s.ct_sec or 0.0) * (1.0 + (s.waiting_starved_pct or 0.0)/100.0)) / availability
+        ct_eff = _effective_ct(s)
         by_step[s.id] = {"ct_eff_sec": ct_eff}
         lt += ct_eff
         bottleneck = max(bottleneck, ct_eff)
     return {"lead_time_sec": lt, "ct_bottleneck_sec": bottleneck, "by_step": by_step}
 
+def simulate_lead_time(steps, n_reps: int = 100_000, available_time_sec: float = 8*3600.0, seed=None,
+                       cv: float = 0.5, downtime_concentration: float = 20.0, chunk: int = 25_000) -> Dict[str,Any]:
+    """Monte Carlo lead time and throughput of a line, all replications drawn as (reps × steps) arrays.
+    Per step and replication:
+      downtime share ~ Beta with mean downtime_pct (availability floored at 0.2 as in compute_lead_time),
+      waiting share ~ Gamma with mean waiting_starved_pct and coefficient of variation cv,
+      changeovers per shift ~ Poisson(changeover_freq), total changeover time ~ Gamma(mean changeover_time_min each),
+      spread over the units the step makes in available_time_sec.
+    Returns percentiles of lead time (sec) and throughput (units per available_time_sec), the share of
+    replications in which each step is the bottleneck, and the deterministic compute_lead_time figure.
+    """
+    cols = steps_to_columns(steps)
+    ids = [s.id for s in steps]
+    ct = _num_col(cols, "ct_sec", len(ids)); d = _num_col(cols, "downtime_pct", len(ids))/100.0
+    w = _num_col(cols, "waiting_starved_pct", len(ids))/100.0
+    co_n = _num_col(cols, "changeover_freq", len(ids)); co_sec = _num_col(cols, "changeover_time_min", len(ids))*60.0
+    rng = np.random.default_rng(seed)
+    k = 1.0/max(cv, 1e-6)**2
+    d = np.clip(d, 0.0, 1.0)
+    a_beta = np.maximum(d*downtime_concentration, 1e-9); b_beta = np.maximum((1.0-d)*downtime_concentration, 1e-9)
+    lead = np.empty(n_reps); bottleneck = np.empty(n_reps); bn_count = np.zeros(len(ids), dtype=np.int64)
+    for lo in range(0, n_reps, chunk):
+        m = min(chunk, n_reps - lo); shape = (m, len(ids))
+        down = np.where(d > 0, rng.beta(a_beta, b_beta, size=shape), 0.0)
+        avail = np.maximum(0.2, 1.0 - down)
+        wait = rng.gamma(k, 1.0, size=shape) * (w/k)
+        n_co = rng.poisson(co_n, size=shape)
+        co_total = rng.gamma(n_co*k, 1.0) * (co_sec/k)
+        ct_eff = np.maximum(0.0, ct*(1.0 + wait))/avail + co_total*ct/available_time_sec
+        lead[lo:lo+m] = ct_eff.sum(axis=1)
+        bottleneck[lo:lo+m] = ct_eff.max(axis=1) if len(ids) else 0.0
+        if len(ids):
+            bn_count += np.bincount(ct_eff.argmax(axis=1), minlength=len(ids))
+    with np.errstate(divide="ignore"):
+        throughput = np.where(bottleneck > 0, available_time_sec/bottleneck, 0.0)
+    lt_p = np.percentile(lead, [10, 50, 90]); tp_p = np.percentile(throughput, [10, 50, 90])
+    return {
+        "n_reps": int(n_reps),
+        "lead_time_sec": {"mean": float(lead.mean()), "p10": float(lt_p[0]), "p50": float(lt_p[1]), "p90": float(lt_p[2])},
+        "throughput_units": {"mean": float(throughput.mean()), "p10": float(tp_p[0]), "p50": float(tp_p[1]), "p90": float(tp_p[2])},
+        "bottleneck_share": {sid: float(c)/max(n_reps, 1) for sid, c in zip(ids, bn_count)},
+        "deterministic": compute_lead_time(steps, available_time_sec=available_time_sec),
+    }
+
+# Order in which the Insights page emits observation rows per step (ties keep this order after sorting)
+OBSERVATION_WASTES = ("defects","waiting","inventory","overproduction","transportation","motion","overprocessing","talent","safety")
+
+def observation_evidence(step, waste: str, templates: Dict[str,Any]) -> Tuple[str, str, str]:
+    """Evidence class, marker and note for an observation: Measured / Mixed / Inferred."""
+    primary = False
+    if step:
+        w = waste
+        if w=='defects': primary = (step.defect_pct or 0)>0
+        elif w=='waiting': primary = (step.waiting_starved_pct or 0)>0
+        elif w=='inventory': primary = (step.wip_units_in or 0)>0
+        elif w=='transportation': primary = (step.distance_m or 0)>0 or (step.layout_moves or 0)>0
+        elif w=='motion': primary = True if (step.process_type or 'Manual') else False
+        elif w=='overprocessing': primary = (step.rework_pct or 0)>0
+        elif w=='overproduction': primary = True
+        elif w=='safety': primary = (step.safety_incidents or 0)>0
+    dlt,_ = get_questionnaire_effects(step, templates, waste) if step else (0.0,[])
+    if primary and dlt>0:
+        ev='Mixed'
+    elif primary:
+        ev='Measured'
+    else:
+        ev='Inferred'
+    mk = '●' if ev=='Measured' else ('◐' if ev=='Mixed' else '○')
+    tip = 'Measured: direct metrics' if ev=='Measured' else ('Mixed: metrics + questionnaire' if ev=='Mixed' else 'Inferred: questionnaire/heuristics')
+    return ev, mk, tip
+
+def step_version(step) -> str:
+    """Content stamp of a step: changes whenever any field or questionnaire answer changes."""
+    import hashlib, json
+    payload = [getattr(step, f) for f in STEP_FIELDS]
+    return hashlib.blake2b(json.dumps(payload, sort_keys=True, default=str).encode("utf-8"), digest_size=12).hexdigest()
+
+class ObservationCache:
+    """Per-step cache of effective CT and observation rows for the Insights page.
+    Entries are keyed by step_version(), so refresh() recomputes only steps whose stamp is new
+    (all of them when the thresholds change) and merges the rest back from the cache.
+    Rows are numeric records; the narrative is rendered on demand by observation_text() and memoized.
+    """
+
+    def __init__(self):
+        self._entries: Dict[str, Tuple[float, List[Dict[str,Any]], ProcessStep]] = {}
+        self._text: Dict[Tuple[str, str], str] = {}
+        self._by_id: Dict[str, str] = {}
+        self._context = None
+
+    def _compute(self, steps, templates, th):
+        import copy
+        batch = score_wastes_batch(steps_to_columns(steps), th, templates)
+        for s, sc_row in zip(steps, batch["scores"].tolist()):
+            wres = {"scores": dict(zip(WASTES, sc_row))}
+            rows = []
+            for waste in OBSERVATION_WASTES:
+                row = observation_record(s, waste, wres)
+                if row:
+                    row["evidence"], row["evidence_marker"], row["evidence_note"] = observation_evidence(s, waste, templates)
+                    rows.append(row)
+            # frozen copy for deferred rendering (views and answers dicts keep changing in the UI)
+            snap = ProcessStep(**{f: copy.deepcopy(getattr(s, f)) for f in STEP_FIELDS})
+            yield _effective_ct(s), rows, snap
+
+    def refresh(self, steps, templates: Dict[str,Any]) -> Dict[str,Any]:
+        """Returns {"result": compute_lead_time(...) output, "rows": observation records, "recomputed": [step ids]}."""
+        import json
+        th = templates.get("thresholds", {}) or {}
+        context = json.dumps(th, sort_keys=True, default=str)
+        if context != self._context:
+            self._entries.clear(); self._text.clear(); self._context = context
+        steps = list(steps)
+        stamps = [step_version(s) for s in steps]
+        dirty = {}
+        for s, v in zip(steps, stamps):
+            if v not in self._entries and v not in dirty:
+                dirty[v] = s
+        for v, entry in zip(dirty, self._compute(list(dirty.values()), templates, th)):
+            self._entries[v] = entry
+        live = set(stamps)
+        for v in [k for k in self._entries if k not in live]:
+            del self._entries[v]
+        for k in [k for k in self._text if k[0] not in live]:
+            del self._text[k]
+        self._by_id = {s.id: v for s, v in zip(steps, stamps)}
+
+        lt = 0.0; by_step = {}; bottleneck = 0.0; rows = []
+        for s, v in zip(steps, stamps):
+            ct_eff, step_rows, _ = self._entries[v]
+            by_step[s.id] = {"ct_eff_sec": ct_eff}
+            lt += ct_eff
+            bottleneck = max(bottleneck, ct_eff)
+            rows.extend(dict(r) for r in step_rows)
+        result = {"lead_time_sec": lt, "ct_bottleneck_sec": bottleneck, "by_step": by_step}
+        return {"result": result, "rows": rows, "recomputed": [s.id for s in dirty.values()]}
+
+    def observation_text(self, step_id: str, waste: str, templates: Dict[str,Any]) -> str:
+        """Narrative for one row of the last refresh(), rendered on first use."""
+        v = self._by_id.get(step_id)
+        if v is None or v not in self._entries:
+            return ""
+        key = (v, waste)
+        text = self._text.get(key)
+        if text is None:
+            _, rows, snap = self._entries[v]
+            sc = next((r["score_0_5"] for r in rows if r["waste"] == waste), 0.0)
+            text = self._text[key] = render_observation(snap, waste, sc, templates)
+        return text
+
+    def with_observation_text(self, obs_df, templates: Dict[str,Any], n_rows: int = None):
+        """Copy of obs_df (or its first n_rows) with the 'observation' column filled in, for display/export."""
+        df = (obs_df if n_rows is None else obs_df.head(n_rows)).copy()
+        if not df.empty and "observation" not in df.columns:
+            texts = [self.observation_text(sid, w, templates) for sid, w in zip(df["step_id"], df["waste"])]
+            df.insert(df.columns.get_loc("confidence") + 1, "observation", texts)
+        return df
+
 def build_material_flow_narrative(steps: List[ProcessStep], templates: Dict[str,Any], factory_name: str, year: str, cost_text: str, sales_text: str) -> str:
     seq = []
     for s in steps:
@@ -108,36 +511,113 @@ def build_material_flow_narrative(steps: List[ProcessStep], templates: Dict[str,
 
 
 
-def score_vc_answers(vc_answers: dict, templates: dict, vc_confidence: dict=None, vc_followups: dict=None):
-    """
-    Returns per-stage ranked waste scores (0-5), issues, and a confidence index.
-    vc_confidence: {stage:{qid: factor}} where factor in [0.4..1.0].
-    vc_followups: {stage:{qid:{...}}} values from UI; added to issues.
+@dataclass(frozen=True)
+class CompiledValueChain:
+    """value_chain.questions compiled into dense arrays (S stages × Q question slots × W wastes)."""
+    stages: Tuple[str, ...]
+    stage_index: Dict[str, int]
+    question_ids: Tuple[Tuple[str, ...], ...]   # per stage, in template order
+    question_index: Dict[Tuple[str, str], Tuple[int, int]]  # (stage, qid) -> (stage row, question slot)
+    questions: Tuple[Tuple[dict, ...], ...]     # per stage, the raw question dicts (issues/followups)
+    wastes: Tuple[str, ...]
+    waste_index: Dict[str, int]
+    stage_wastes: Tuple[Tuple[int, ...], ...]   # per stage, waste columns in first-seen order
+    weights: Any                                # (S, Q, W) float64
+    max_possible: Any                           # (S,) float64, floored at 1e-6
+    n_questions: Any                            # (S,) int
+
+def _compile_value_chain(qmap) -> CompiledValueChain:
+    stages = tuple(qmap.keys())
+    wastes = []; waste_index = {}
+    stage_wastes = []; qids = []; qdicts = []
+    for stage in stages:
+        qlist = qmap.get(stage) or []
+        seen = []
+        for q in qlist:
+            for w in (q.get('waste_weights', {}) or {}):
+                if w not in waste_index:
+                    waste_index[w] = len(wastes); wastes.append(w)
+                if waste_index[w] not in seen:
+                    seen.append(waste_index[w])
+        stage_wastes.append(tuple(seen))
+        qids.append(tuple(q.get('id') for q in qlist)); qdicts.append(tuple(qlist))
+    S = len(stages); Q = max((len(x) for x in qids), default=0); W = len(wastes)
+    weights = np.zeros((S, Q, W)); max_possible = np.zeros(S)
+    for s, qlist in enumerate(qdicts):
+        mp = 0.0
+        for j, q in enumerate(qlist):
+            ww = q.get('waste_weights', {}) or {}
+            mp += max((abs(v)*4.0 for v in ww.values()), default=0.0)
+            for w, wt in ww.items():
+                weights[s, j, waste_index[w]] = float(wt)
+        max_possible[s] = max(mp, 1e-6)
+    weights.setflags(write=False); max_possible.setflags(write=False)
+    qindex = {(stage, qid): (s, j) for s, stage in enumerate(stages) for j, qid in enumerate(qids[s])}
+    return CompiledValueChain(stages, {st: i for i, st in enumerate(stages)}, tuple(qids), qindex, tuple(qdicts),
+                              tuple(wastes), waste_index, tuple(stage_wastes), weights, max_possible,
+                              np.array([len(x) for x in qids], dtype=int))
+
+_VC_CACHE: Dict[int, Tuple[Any, CompiledValueChain]] = {}
+
+def compile_value_chain(templates: dict) -> CompiledValueChain:
+    """Compiled question-weight model for templates['value_chain']['questions'].
+    Memoized on the questions mapping object; a replaced value_chain block compiles afresh.
     """
+    qmap = (templates.get('value_chain',{}) or {}).get('questions',{}) or {}
+    hit = _VC_CACHE.get(id(qmap))
+    if hit is not None and hit[0] is qmap:
+        return hit[1]
+    cvc = _compile_value_chain(qmap)
+    if len(_VC_CACHE) >= 8:
+        _VC_CACHE.pop(next(iter(_VC_CACHE)))
+    _VC_CACHE[id(qmap)] = (qmap, cvc)
+    return cvc
+
+def vc_answers_to_arrays(answer_sets, cvc: CompiledValueChain, confidence_sets=None):
+    """Pack N answer dicts ({stage:{qid: score}}) into score A and confidence C arrays of shape (N, S, Q),
+    plus a (N, S) mask of the stages each assessment answered."""
+    N = len(answer_sets); S, Q = cvc.weights.shape[:2]
+    A = np.zeros((N, S, Q)); C = np.ones((N, S, Q)); present = np.zeros((N, S), dtype=bool)
+    for n, vc_answers in enumerate(answer_sets):
+        conf = (confidence_sets[n] if confidence_sets is not None else None) or {}
+        for stage, ans in (vc_answers or {}).items():
+            s = cvc.stage_index.get(stage)
+            if s is None: continue
+            present[n, s] = True
+            cst = conf.get(stage) or {}
+            for j, qid in enumerate(cvc.question_ids[s]):
+                A[n, s, j] = float(ans.get(qid, 0))
+                if qid in cst:
+                    C[n, s, j] = float(cst[qid] or 1.0)
+    return A, C, present
+
+def score_vc_matrix(A, C, cvc: CompiledValueChain):
+    """Normalized 0-5 waste scores (N, S, W) and confidence index (N, S) for packed answers.
+    Accumulates question by question, in template order, so values match score_vc_answers exactly."""
+    A = np.asarray(A, dtype=float); C = np.asarray(C, dtype=float)
+    raw = np.zeros(A.shape[:-1] + (cvc.weights.shape[2],))
+    for j in range(A.shape[-1]):
+        raw += (A[..., j, None] * cvc.weights[:, j, :]) * C[..., j, None]
+    scores = np.clip(5.0*raw/cvc.max_possible[:, None], 0.0, 5.0)
+    nq = cvc.n_questions
+    qmask = np.arange(A.shape[-1])[None, :] < nq[:, None]
+    conf = np.where(nq > 0, (C*qmask).sum(axis=-1)/np.maximum(nq, 1), 1.0)
+    return scores, conf
+
+def _vc_stage_results(vc_answers, A, C, scores, cvc: CompiledValueChain, vc_followups=None):
+    """score_vc_answers output for one assessment from its packed (S, Q) arrays and (S, W) scores."""
     out = {}
-    qmap = (templates.get('value_chain',{}) or {}).get('questions',{})
+    scores = scores.tolist()
     for stage, ans in (vc_answers or {}).items():
-        qlist = qmap.get(stage, [])
-        waste_scores = {}
-        max_possible = 0.0
+        s = cvc.stage_index.get(stage)
+        if s is None:
+            out[stage] = {"ranked": [], "issues": [], "confidence": 1.0}
+            continue
         issues = []
-        conf_vals = []
-        for q in qlist:
-            qid = q.get('id')
-            score = float(ans.get(qid, 0))
-            ww = q.get('waste_weights', {}) or {}
-            # confidence factor
-            cf = 1.0
-            if vc_confidence and stage in vc_confidence and qid in vc_confidence[stage]:
-                cf = float(vc_confidence[stage][qid] or 1.0)
-            conf_vals.append(cf)
-            # accumulate
-            local_max = max( (abs(v)*4.0 for v in ww.values()), default=0.0 )
-            max_possible += local_max
-            for w, wt in ww.items():
-                waste_scores[w] = waste_scores.get(w, 0.0) + score * float(wt) * cf
+        for j, q in enumerate(cvc.questions[s]):
+            qid = cvc.question_ids[s][j]
             # capture high-severity issue line
-            if score >= 3 and q.get('issue_if_high'):
+            if A[s, j] >= 3 and q.get('issue_if_high'):
                 issues.append(q['issue_if_high'])
             # include followups values
             if vc_followups and stage in vc_followups and qid in vc_followups[stage]:
@@ -146,16 +626,129 @@ def score_vc_answers(vc_answers: dict, templates: dict, vc_confidence: dict=None
                     for k,v in fvals.items():
                         if v not in (None, '', []):
                             issues.append(f"{q.get('text','')}: {k} = {v}")
-        # normalize
-        ranked = []
-        denom = max(max_possible, 1e-6)
-        for w, sc in waste_scores.items():
-            ranked.append((w, max(0.0, min(5.0, 5.0*sc/denom))))
+        ranked = [(cvc.wastes[w], scores[s][w]) for w in cvc.stage_wastes[s]]
         ranked.sort(key=lambda x: x[1], reverse=True)
+        conf_vals = C[s, :cvc.n_questions[s]].tolist()
         conf_index = sum(conf_vals)/len(conf_vals) if conf_vals else 1.0
         out[stage] = {"ranked": ranked, "issues": issues, "confidence": conf_index}
     return out
 
+def score_vc_answers(vc_answers: dict, templates: dict, vc_confidence: dict=None, vc_followups: dict=None):
+    """
+    Returns per-stage ranked waste scores (0-5), issues, and a confidence index.
+    vc_confidence: {stage:{qid: factor}} where factor in [0.4..1.0].
+    vc_followups: {stage:{qid:{...}}} values from UI; added to issues.
+    """
+    cvc = compile_value_chain(templates)
+    A, C, _ = vc_answers_to_arrays([vc_answers], cvc, [vc_confidence])
+    scores, _ = score_vc_matrix(A, C, cvc)
+    return _vc_stage_results(vc_answers, A[0], C[0], scores[0], cvc, vc_followups)
+
+# Per-process state of score_vc_answers_batch workers (set once by the pool initializer)
+_VC_WORKER: Dict[str, Any] = {}
+
+def _vc_worker_init(templates):
+    _VC_WORKER["templates"] = templates
+    compile_value_chain(templates)
+
+def _score_vc_chunk(chunk, templates=None):
+    cvc = compile_value_chain(templates if templates is not None else _VC_WORKER["templates"])
+    answers = [a for a, _, _ in chunk]
+    A, C, _ = vc_answers_to_arrays(answers, cvc, [c for _, c, _ in chunk])
+    scores, _ = score_vc_matrix(A, C, cvc)
+    return [_vc_stage_results(a, A[n], C[n], scores[n], cvc, f) for n, (a, _, f) in enumerate(chunk)]
+
+def score_vc_answers_batch(answer_sets, templates: dict, vc_confidences=None, vc_followups=None, workers: int = None, chunk_size: int = 256):
+    """score_vc_answers for many sites at once; returns one result per site, in input order.
+    vc_confidences / vc_followups are optional lists aligned with answer_sets.
+    Chunks of chunk_size sites are scored as stacked arrays; with workers > 1 (default: CPU count)
+    the chunks fan out over a process pool that receives the templates once per worker.
+    """
+    n = len(answer_sets)
+    items = [(answer_sets[i],
+              vc_confidences[i] if vc_confidences is not None else None,
+              vc_followups[i] if vc_followups is not None else None) for i in range(n)]
+    chunk_size = max(1, int(chunk_size))
+    chunks = [items[i:i+chunk_size] for i in range(0, n, chunk_size)]
+    workers = min(int(workers or os.cpu_count() or 1), len(chunks))
+    if workers <= 1:
+        return [r for ch in chunks for r in _score_vc_chunk(ch, templates)]
+    from pools import process_map
+    return [r for res in process_map(_score_vc_chunk, chunks, workers, initializer=_vc_worker_init, initargs=(templates,)) for r in res]
+
+
+# ---------- Template bundle ----------
+@dataclass(frozen=True)
+class TemplateBundle:
+    """Parsed templates.yaml plus lookup indexes, keyed by the sha256 of its content.
+    Bundles are shared by every session in the process: treat `templates` as read-only.
+    """
+    content_hash: str
+    templates: Dict[str, Any]
+    stage_questions: Mapping[str, Tuple[dict, ...]]
+    questions_by_id: Mapping[Tuple[str, str], dict]   # (stage, qid) -> question
+    waste_index: Mapping[str, int]                    # WASTES first, then value-chain-only wastes
+    profile_benchmarks: Mapping[str, Mapping[str, Any]]
+    thresholds: Mapping[str, Any]
+    value_chain: Any                                  # CompiledValueChain
+
+def _build_template_bundle(content_hash: str, templates: Dict[str, Any]) -> TemplateBundle:
+    from types import MappingProxyType as _ro
+    vc = (templates.get("value_chain", {}) or {}).get("questions", {}) or {}
+    stage_questions = {stage: tuple(qs or []) for stage, qs in vc.items()}
+    questions_by_id = {(stage, q.get("id")): q for stage, qs in stage_questions.items() for q in qs}
+    cvc = compile_value_chain(templates)
+    waste_index = {w: i for i, w in enumerate(WASTES)}
+    for w in cvc.wastes:
+        waste_index.setdefault(w, len(waste_index))
+    profiles = templates.get("profiles", {}) or {}
+    benchmarks = {k: _ro(dict((p or {}).get("benchmarks", {}) or {})) for k, p in profiles.items()}
+    return TemplateBundle(content_hash, templates, _ro(stage_questions), _ro(questions_by_id), _ro(waste_index),
+                          _ro(benchmarks), _ro(dict(templates.get("thresholds", {}) or {})), cvc)
+
+_BUNDLES: Dict[str, TemplateBundle] = {}
+_FILE_HASHES: Dict[str, Tuple[Tuple[int, int], str, bytes]] = {}
+_BUNDLE_LOCK = threading.Lock()
+_MAX_BUNDLES = 16
+
+def _remember_bundle(content_hash: str, parse) -> TemplateBundle:
+    with _BUNDLE_LOCK:
+        b = _BUNDLES.get(content_hash)
+        if b is None:
+            b = _build_template_bundle(content_hash, parse())
+            if len(_BUNDLES) >= _MAX_BUNDLES:
+                _BUNDLES.pop(next(iter(_BUNDLES)))
+            _BUNDLES[content_hash] = b
+        return b
+
+def load_template_bundle(path: str = "templates.yaml", override_text: str = None) -> TemplateBundle:
+    """The TemplateBundle for `path`, parsed once per distinct content.
+    The file is only re-read when its mtime/size change. override_text is the in-session YAML from
+    Benchmarks & Rules; its top-level keys replace those of the file, as the old in-place update did.
+    """
+    import hashlib
+    import yaml
+    st_ = os.stat(path)
+    stamp = (st_.st_mtime_ns, st_.st_size)
+    with _BUNDLE_LOCK:
+        hit = _FILE_HASHES.get(path)
+    if hit is None or hit[0] != stamp:
+        with open(path, "rb") as f:
+            raw = f.read()
+        hit = (stamp, hashlib.sha256(raw).hexdigest(), raw)
+        with _BUNDLE_LOCK:
+            _FILE_HASHES[path] = hit
+    file_hash, raw = hit[1], hit[2]
+    base = _remember_bundle(file_hash, lambda: yaml.safe_load(raw.decode("utf-8")) or {})
+    if not override_text:
+        return base
+    key = hashlib.sha256((file_hash + "\n").encode("utf-8") + override_text.encode("utf-8")).hexdigest()
+    def _merged():
+        parsed = yaml.safe_load(override_text)
+        if not isinstance(parsed, dict):
+            raise ValueError("templates override must be a YAML mapping")
+        return {**base.templates, **parsed}
+    return _remember_bundle(key, _merged)
 
 def _get(d, path, default=None):
     cur = d or {}
@@ -247,3 +840,820 @@ def estimate_business_case(vc_summary, templates, vc_followups=None, assumptions
 
     total = sum(by_waste.values())
     return {"by_waste": by_waste, "notes": [], "total": total}
+
+# ---------- Vectorized business case ----------
+BUSINESS_CASE_WASTES = ("defects","waiting","inventory","transportation","motion","overprocessing","overproduction","safety")
+_BC_SCORED = ("defects","waiting","inventory","transportation","motion","overproduction","safety")
+BUSINESS_CASE_ASSUMPTIONS = {"labor_cost_per_hour": 50.0, "material_cost_per_unit": 100.0, "rework_time_min_per_unit": 10.0,
+                             "forklift_cost_per_hour": 120.0, "cost_of_capital_pct": 12.0, "avg_monthly_volume_units": 10000.0}
+
+def business_case_arrays(vc_summary, vc_followups=None) -> Dict[str, Any]:
+    """Per-stage inputs of estimate_business_case as length-S arrays: top-3 scores per waste ("sc_<waste>"),
+    confidence, and follow-up figures. NaN in an override column means "use the global assumption"."""
+    rows = list(vc_summary or []); S = len(rows); nan = float("nan")
+    arr = {f"sc_{w}": np.zeros(S) for w in _BC_SCORED}
+    for k in ("def_cost","def_rework","def_units","fin_rate_pct","forklift"):
+        arr[k] = np.full(S, nan)
+    for k in ("ops","chg_per_month","avg_fg","loads_per_day"):
+        arr[k] = np.zeros(S)
+    arr["confidence"] = np.ones(S)
+    for i, row in enumerate(rows):
+        stage_name = row.get("stage_name","")
+        for w, sc in row.get("top3", []):
+            if w in _BC_SCORED and arr[f"sc_{w}"][i] == 0.0:
+                arr[f"sc_{w}"][i] = sc
+        arr["confidence"][i] = float(row.get("confidence", 1.0) or 1.0)
+        fu = (vc_followups or {}).get(stage_name) or {}
+        f_unit = fu.get("first_pass_yield")
+        if isinstance(f_unit, dict):
+            arr["def_cost"][i] = float(f_unit.get("unit_material_cost") or nan)
+            arr["def_rework"][i] = float(f_unit.get("rework_time_min") or nan)
+            arr["def_units"][i] = float(f_unit.get("monthly_volume_units") or nan)
+        f_chg = fu.get("changeover_time")
+        arr["ops"][i] = float((f_chg or {}).get("operators_n") or 0.0)
+        arr["chg_per_month"][i] = float((f_chg or {}).get("changeovers_per_month") or 0.0)
+        f_fg = fu.get("aging_fg")
+        arr["avg_fg"][i] = float((f_fg or {}).get("avg_fg_value") or 0.0)
+        arr["fin_rate_pct"][i] = float((f_fg or {}).get("finance_rate_pct") or nan)
+        f_load = fu.get("loading_time")
+        arr["loads_per_day"][i] = float((f_load or {}).get("loads_per_day") or 0.0)
+        arr["forklift"][i] = float((f_load or {}).get("forklift_cost_per_hour") or nan)
+    return arr
+
+def business_case_kernel(arr: Dict[str, Any], a: Dict[str, Any], scores: Dict[str, Any] = None):
+    """estimate_business_case formulas over a batch. `a` maps each BUSINESS_CASE_ASSUMPTIONS key to a scalar
+    or an array of batch shape B; `scores` optionally replaces the "sc_<waste>" columns with (B..., S) arrays.
+    Stages are accumulated in order, so a batch element equals the scalar result bit for bit.
+    Returns ({waste: array B}, total array B)."""
+    labor_hr = np.asarray(a["labor_cost_per_hour"], dtype=float); mat_cost = np.asarray(a["material_cost_per_unit"], dtype=float)
+    rework_min = np.asarray(a["rework_time_min_per_unit"], dtype=float); fl_cost = np.asarray(a["forklift_cost_per_hour"], dtype=float)
+    finance_pct = np.asarray(a["cost_of_capital_pct"], dtype=float)/100.0; vol_month = np.asarray(a["avg_monthly_volume_units"], dtype=float)
+    sc = {w: (scores[w] if scores is not None and w in scores else arr[f"sc_{w}"]) for w in _BC_SCORED}
+    shape = np.broadcast_shapes(labor_hr.shape, mat_cost.shape, rework_min.shape, fl_cost.shape, finance_pct.shape, vol_month.shape,
+                                *[np.shape(v)[:-1] for v in sc.values()])
+    by_waste = {w: np.zeros(shape) for w in BUSINESS_CASE_WASTES}
+    def sev(x): return np.clip(x/5.0, 0.0, 1.0)
+    def pick(override, default): return default if np.isnan(override) else override
+    for s in range(len(arr["ops"])):
+        sc_def, sc_wait, sc_inv, sc_tr, sc_mo, sc_op, sc_sa = (sc[w][..., s] for w in _BC_SCORED)
+        cost_unit = pick(arr["def_cost"][s], mat_cost); re_min = pick(arr["def_rework"][s], rework_min); units = pick(arr["def_units"][s], vol_month)
+        saving = units*12*(0.1*sev(sc_def))*(cost_unit + (re_min/60.0)*labor_hr) * 0.5
+        by_waste["defects"] += np.where(sc_def > 0, saving, 0.0)
+
+        ops = arr["ops"][s]; chg = arr["chg_per_month"][s]
+        saving = ((30.0*sev(sc_wait))/60.0)*ops*chg*12*labor_hr
+        saving = np.where((sc_wait > 0) & (ops > 0) & (chg > 0), saving, 0.0)
+        by_waste["waiting"] += saving
+        by_waste["overprocessing"] += 0.2*saving
+
+        avg_fg = arr["avg_fg"][s]
+        fin_rate = pick(arr["fin_rate_pct"][s], finance_pct*100.0)/100.0
+        by_waste["inventory"] += np.where((sc_inv > 0) & (avg_fg > 0), (avg_fg*0.2*sev(sc_inv))*fin_rate, 0.0)
+
+        loads = arr["loads_per_day"][s]; fl = pick(arr["forklift"][s], fl_cost)
+        by_waste["transportation"] += np.where((sc_tr > 0) & (loads > 0), ((10.0*sev(sc_tr))/60.0)*loads*300*fl, 0.0)
+
+        by_waste["motion"] += np.where((sc_mo > 0) & (ops > 0), ops*labor_hr*200*0.1*sev(sc_mo), 0.0)
+        by_waste["overproduction"] += np.where((sc_op > 0) & (avg_fg > 0), avg_fg*0.05*sev(sc_op), 0.0)
+        by_waste["safety"] += np.where(sc_sa > 0, 20000.0*sev(sc_sa), 0.0)
+    total = np.zeros(shape)
+    for w in BUSINESS_CASE_WASTES:
+        total = total + by_waste[w]
+    return by_waste, total
+
+def _percentiles(x) -> Dict[str, float]:
+    p = np.percentile(x, [10, 50, 90])
+    return {"p10": float(p[0]), "p50": float(p[1]), "p90": float(p[2]), "mean": float(np.mean(x))}
+
+def estimate_business_case_mc(vc_summary, templates, vc_followups=None, assumptions=None, n_samples: int = 20000, seed=None,
+                              assumption_spread=0.15, severity_spread: float = 1.0) -> Dict[str,Any]:
+    """Uncertainty-aware estimate_business_case: P10/P50/P90 savings per waste from batched draws.
+    Each global assumption is drawn from a triangular distribution around its value (±assumption_spread, a float
+    or {key: spread}); each stage's top-3 severity gets normal noise of sd severity_spread × (1 − stage confidence),
+    clipped to 0..5, so measured stages stay put and guessed ones widen the band.
+    """
+    assumptions = (assumptions or {})
+    rng = np.random.default_rng(seed)
+    arr = business_case_arrays(vc_summary, vc_followups)
+    a = {}
+    for k, default in BUSINESS_CASE_ASSUMPTIONS.items():
+        v = float(assumptions.get(k, default))
+        spr = float(assumption_spread.get(k, 0.0) if isinstance(assumption_spread, dict) else assumption_spread)
+        a[k] = rng.triangular(v*(1-spr), v, v*(1+spr), size=n_samples) if spr > 0 and v != 0 else np.full(n_samples, v)
+    sd = severity_spread * (1.0 - np.clip(arr["confidence"], 0.0, 1.0))
+    scores = {}
+    for w in _BC_SCORED:
+        base = arr[f"sc_{w}"]
+        noisy = np.clip(base + rng.standard_normal((n_samples, base.size))*sd, 0.0, 5.0)
+        scores[w] = np.where(base > 0, noisy, 0.0)
+    by_waste, total = business_case_kernel(arr, a, scores)
+    return {"by_waste": {w: _percentiles(v) for w, v in by_waste.items()}, "total": _percentiles(total), "n_samples": int(n_samples)}
+
+# ---------- KPI history sketches ----------
+class QuantileSketch:
+    """Mergeable KLL-style quantile sketch for one KPI's reading history.
+    Readings land in level 0; a level over its capacity is sorted and every other item (random offset)
+    moves up a level with double weight, so memory stays O(k) however many readings arrive.
+    Exact while fewer than k readings have been seen. rank()/quantile() use a sorted summary that is
+    rebuilt once after updates, then answered by binary search over the stored items. Compaction keeps each
+    level within its capacity (k at the top, 2/3 of that per level below, at least 2), so fewer than
+    3k + 2·levels items are stored, plus under k pending single update()s; for k=200 that measures about
+    120 after a 2M-value bulk load and 150-450 under chunked updates.
+    """
+
+    def __init__(self, k: int = 200, seed: int = 0):
+        self.k = int(k); self.n = 0
+        self._levels: List[np.ndarray] = [np.empty(0)]
+        self._pending: List[float] = []
+        self._rng = np.random.default_rng(seed)
+        self._summary = None
+
+    @classmethod
+    def from_values(cls, values, k: int = 200, seed: int = 0) -> "QuantileSketch":
+        sk = cls(k=k, seed=seed); sk.update_many(values); return sk
+
+    def __len__(self):
+        return self.n + len(self._pending)
+
+    def _capacity(self, h: int) -> int:
+        return max(2, int(self.k * (2.0/3.0) ** (len(self._levels) - 1 - h)))
+
+    def update(self, x) -> None:
+        """Add one reading; None/NaN are skipped like in update_many."""
+        if x is None: return
+        x = float(x)
+        if math.isnan(x): return
+        self._pending.append(x); self._summary = None
+        if len(self._pending) >= self.k:
+            self._flush()
+
+    def update_many(self, values) -> None:
+        """Add readings from any iterable or array; None/NaN are skipped."""
+        if not isinstance(values, np.ndarray):
+            values = [x for x in values if x is not None]
+        arr = np.asarray(values, dtype=float).ravel()
+        arr = arr[~np.isnan(arr)]
+        if arr.size:
+            self._levels[0] = np.concatenate([self._levels[0], arr]); self.n += int(arr.size)
+            self._summary = None; self._compress()
+
+    def merge(self, other: "QuantileSketch") -> "QuantileSketch":
+        """Fold other's readings into this sketch (other is left unchanged)."""
+        other._flush(); self._flush()
+        while len(self._levels) < len(other._levels):
+            self._levels.append(np.empty(0))
+        for h, lvl in enumerate(other._levels):
+            self._levels[h] = np.concatenate([self._levels[h], lvl])
+        self.n += other.n; self._summary = None; self._compress()
+        return self
+
+    def _flush(self):
+        if self._pending:
+            pending, self._pending = self._pending, []
+            self.update_many(np.asarray(pending, dtype=float))
+
+    def _compress(self):
+        h = 0
+        while h < len(self._levels):
+            lvl = self._levels[h]
+            if lvl.size <= self._capacity(h):
+                h += 1; continue
+            lvl = np.sort(lvl)
+            keep, pair = (lvl[:1], lvl[1:]) if lvl.size % 2 else (lvl[:0], lvl)
+            if h + 1 == len(self._levels):
+                self._levels.append(np.empty(0))
+            self._levels[h] = keep
+            self._levels[h+1] = np.concatenate([self._levels[h+1], pair[int(self._rng.integers(2))::2]])
+            h = 0  # capacities shift when a level is added
+
+    def _sorted(self):
+        self._flush()
+        if self._summary is None:
+            vals = np.concatenate(self._levels)
+            wts = np.concatenate([np.full(l.size, 2.0**h) for h, l in enumerate(self._levels)])
+            order = np.argsort(vals, kind="stable")
+            self._summary = (vals[order], np.concatenate([[0.0], np.cumsum(wts[order])]))
+        return self._summary
+
+    def rank(self, x) -> float:
+        """Fraction of readings strictly below x (bisect_left / n on the raw history)."""
+        vals, cum = self._sorted()
+        if not vals.size: return 0.0
+        return float(cum[int(np.searchsorted(vals, float(x), side="left"))] / cum[-1])
+
+    def quantile(self, q: float) -> float:
+        vals, cum = self._sorted()
+        if not vals.size: return float("nan")
+        i = int(np.searchsorted(cum[1:], max(0.0, min(1.0, float(q))) * cum[-1], side="left"))
+        return float(vals[min(i, vals.size - 1)])
+
+    @property
+    def size(self) -> int:
+        """Stored items: under 3k + 2 per level after compaction, plus under k pending update()s."""
+        return sum(int(l.size) for l in self._levels) + len(self._pending)
+
+    def to_dict(self) -> Dict[str, Any]:
+        self._flush()
+        return {"k": self.k, "n": self.n, "levels": [l.tolist() for l in self._levels]}
+
+    @classmethod
+    def from_dict(cls, d: Dict[str, Any]) -> "QuantileSketch":
+        sk = cls(k=d.get("k", 200)); sk.n = int(d.get("n", 0))
+        sk._levels = [np.asarray(l, dtype=float) for l in d.get("levels", [[]])] or [np.empty(0)]
+        return sk
+
+def as_quantile_sketch(history) -> QuantileSketch:
+    """A KPI history as a sketch: sketches pass through, lists/arrays are loaded (exact below k readings).
+    Convert once when the history is stored; loading is O(n)."""
+    return history if isinstance(history, QuantileSketch) else QuantileSketch.from_values(history if history is not None else [])
+
+def _history_rank(history, val):
+    """(readings, fraction of readings below val) for one KPI history: sketches answer from their summary,
+    plain lists are ranked exactly as before (sorted + bisect_left)."""
+    if isinstance(history, QuantileSketch):
+        return len(history), (history.rank(val) if len(history) else 0.0)
+    import bisect
+    hist = sorted([float(x) for x in (history or []) if x is not None])
+    return len(hist), (bisect.bisect_left(hist, val)/len(hist) if hist else 0.0)
+
+def _kpi_col(name) -> str:
+    return str(name).strip().lower()
+
+def iter_table_chunks(source, wanted, fmt: str = None, chunksize: int = 100_000):
+    """DataFrame chunks of a CSV or Parquet path/file, reading only columns whose lower-cased name is in wanted."""
+    import pandas as pd
+    fmt = (fmt or os.path.splitext(str(getattr(source, "name", source)))[1].lstrip(".")).lower()
+    if fmt in ("parquet", "pq"):
+        try:
+            import pyarrow.parquet as pq
+        except ImportError as e:
+            raise ImportError("Parquet input needs pyarrow") from e
+        pf = pq.ParquetFile(source)
+        cols = [c for c in pf.schema_arrow.names if _kpi_col(c) in wanted]
+        for batch in pf.iter_batches(batch_size=chunksize, columns=cols):
+            yield batch.to_pandas()
+    else:
+        yield from pd.read_csv(source, chunksize=chunksize, usecols=lambda c: _kpi_col(c) in wanted)
+
+def ingest_kpi_history(source, metrics, history=None, fmt: str = None, chunksize: int = 100_000, k: int = 200) -> Dict[str, QuantileSketch]:
+    """Stream a KPI extract (CSV or Parquet path/file) into {metric: QuantileSketch}, one chunk at a time.
+    Wide files carry one column per metric (fpy_pct, inventory_days, ...); long files carry metric (or kpi)
+    and value columns. Only the needed columns are read. Readings are added to history when given.
+    """
+    import pandas as pd
+    metrics = [_kpi_col(m) for m in metrics]
+    history = history if history is not None else {}
+    for m in list(history):
+        history[m] = as_quantile_sketch(history[m])  # plain-list readings are loaded once, here
+    for m in metrics:
+        history.setdefault(m, QuantileSketch(k=k))
+    for df in iter_table_chunks(source, set(metrics) | {"metric", "kpi", "value"}, fmt, chunksize):
+        cols = {_kpi_col(c): c for c in df.columns}
+        name_col = cols.get("metric", cols.get("kpi"))
+        if name_col is not None and "value" in cols:
+            vals = pd.to_numeric(df[cols["value"]], errors="coerce")
+            for m, grp in vals.groupby(df[name_col].astype(str).str.strip().str.lower()):
+                if m in history: history[m].update_many(grp.to_numpy())
+        for m in metrics:
+            if m in cols: history[m].update_many(pd.to_numeric(df[cols[m]], errors="coerce").to_numpy())
+    return history
+
+# ---------- PACE prioritization ----------
+def _edge_factor_from_ratio(ratio):
+    """Convert ratio vs target to a gentle multiplier around 1.0, clamped to [0.7, 1.3] so it nudges but doesn't dominate."""
+    try:
+        r = float(ratio)
+    except Exception:
+        return 1.0
+    val = 1.0 + max(-0.4, min(0.4, math.log(r if r>0 else 1e-6)))
+    return max(0.7, min(1.3, val))
+
+def compute_edge_percentiles(templates, profile_key=None, measured=None, history=None):
+    """Return edge multipliers per waste using benchmark targets and optional history.
+    measured: dict like {'fpy_pct': 96, 'smed_changeover_min': 35, ...}
+    history: per-metric readings for percentiles, e.g., {'fpy_pct':[95,97,98]}; lists are ranked exactly,
+    QuantileSketch values (see ingest_kpi_history) in constant time with the sketch's rank error
+    """
+    prio = templates.get("prioritization", {})
+    metrics = prio.get("edge_metrics", {})
+    prof = templates.get("profiles", {}).get(profile_key or "", {})
+    bm = (prof.get("benchmarks", {}) if prof else {})
+    edge = {}
+    measured = measured or {}
+    history = history or {}
+    for waste, m in metrics.items():
+        key = m.get("key")
+        hib = bool(m.get("higher_is_better", True))
+        target = bm.get(key)
+        val = measured.get(key)
+        if val is None or target is None:
+            edge[waste] = 1.0
+            continue
+        # ratio vs target (>=1 good if hib; else <=1 good)
+        ratio = (val/target) if hib else (target/max(val,1e-6))
+        factor = _edge_factor_from_ratio(ratio)
+        # nudge with historical percentile (worse -> higher factor)
+        n_hist, p = _history_rank(history.get(key), val)
+        if n_hist >= 5:
+            if not hib:
+                p = 1.0 - p
+            factor *= (1.0 + max(0.0, 0.2*(0.5 - p)))
+        edge[waste] = max(0.7, min(1.4, factor))
+    return edge
+
+def compute_pace(vc_summary, savings, templates, objective_weights=None, profile_key=None, measured=None, history=None):
+    """Kafaa PACE: Present (stage severity) × Advantage (benefit) × Critical (objective weights) × Edge (vs benchmark)."""
+    prio = templates.get("prioritization", {})
+    obj2w = prio.get("objective_to_waste", {})
+    if not objective_weights:
+        objective_weights = {o["id"]: o.get("weight",1.0) for o in prio.get("critical_objectives",[])}
+    total_w = sum(objective_weights.values()) or 1.0
+    obj_norm = {k: float(v)/total_w for k,v in objective_weights.items()}
+
+    waste_weight = {}
+    for obj, ow in obj_norm.items():
+        for w, coef in obj2w.get(obj, {}).items():
+            waste_weight[w] = waste_weight.get(w, 0.0) + ow*float(coef)
+
+    present = {}
+    for row in (vc_summary or []):
+        for w, sc in row.get("top3", []):
+            present[w] = present.get(w, 0.0) + float(sc or 0.0)
+
+    by_waste = (savings or {}).get("by_waste", {})
+    edge = compute_edge_percentiles(templates, profile_key=profile_key, measured=measured, history=history)
+
+    combined = {}
+    for w in set(list(present.keys()) + list(by_waste.keys()) + list(waste_weight.keys())):
+        sev = present.get(w, 0.0)/max(1.0, len(vc_summary or []))  # avg stage score 0..5
+        ben = float(by_waste.get(w, 0.0))
+        ww  = float(waste_weight.get(w, 0.0))
+        combined[w] = (sev/5.0) * (1.0 + ww) * edge.get(w,1.0) * (math.log10(ben + 10.0))
+    top_wastes = sorted(combined.items(), key=lambda x: x[1], reverse=True)
+
+    badge_min = prio.get("kpi_badge",{}).get("min_tracked", 4)
+    weights = list(objective_weights.values()) or [1.0]
+    med = sorted(weights)[len(weights)//2]
+    tracked = sum(1 for v in weights if v >= med)
+    badge = {"enabled": tracked >= badge_min, "tracked": tracked, "required": badge_min}
+
+    return {"top_wastes": top_wastes, "waste_weight": waste_weight, "badge": badge, "edge": edge}
+
+def _fingerprint_default(o):
+    if isinstance(o, QuantileSketch): return o.to_dict()
+    if isinstance(o, np.ndarray): return o.tolist()
+    if isinstance(o, np.generic): return o.item()
+    return str(o)
+
+def pace_fingerprint(vc_summary, savings, templates, objective_weights=None, profile_key=None, measured=None, history=None) -> str:
+    """Stable hash of everything compute_pace reads; only the prioritization block and the profile's
+    benchmarks are taken from templates."""
+    import hashlib, json
+    payload = {"vc": vc_summary or [], "by_waste": (savings or {}).get("by_waste", {}), "obj": objective_weights or {},
+               "prio": templates.get("prioritization", {}),
+               "bm": (templates.get("profiles", {}).get(profile_key or "", {}) or {}).get("benchmarks", {}),
+               "measured": measured or {}, "history": history or {}}
+    raw = json.dumps(payload, sort_keys=True, default=_fingerprint_default)
+    return hashlib.blake2b(raw.encode("utf-8"), digest_size=16).hexdigest()
+
+_PACE_CACHE: "OrderedDict[str, Dict[str,Any]]" = OrderedDict()
+_PACE_LOCK = threading.Lock()
+_MAX_PACE = 256
+
+def compute_pace_cached(vc_summary, savings, templates, objective_weights=None, profile_key=None, measured=None, history=None):
+    """compute_pace memoized process-wide (so across sessions) by pace_fingerprint, LRU-evicted beyond _MAX_PACE.
+    Returns a fresh copy, so callers may mutate it."""
+    import copy
+    key = pace_fingerprint(vc_summary, savings, templates, objective_weights, profile_key, measured, history)
+    with _PACE_LOCK:
+        hit = _PACE_CACHE.get(key)
+        if hit is not None:
+            _PACE_CACHE.move_to_end(key)
+            return copy.deepcopy(hit)
+    out = compute_pace(vc_summary, savings, templates, objective_weights=objective_weights, profile_key=profile_key, measured=measured, history=history)
+    with _PACE_LOCK:
+        _PACE_CACHE[key] = out
+        _PACE_CACHE.move_to_end(key)
+        while len(_PACE_CACHE) > _MAX_PACE:
+            _PACE_CACHE.popitem(last=False)
+    return copy.deepcopy(out)
+
+def pace_weight_grid(objective_ids, levels=(0.5, 1.0, 1.5, 2.0)) -> np.ndarray:
+    """Every combination of `levels` over the objectives: (len(levels)**O, O) weight vectors."""
+    import itertools
+    return np.array(list(itertools.product(levels, repeat=len(objective_ids))), dtype=float).reshape(-1, len(objective_ids))
+
+def pace_sensitivity(vc_summary, savings, templates, weight_grid=None, levels=(0.5, 1.0, 1.5, 2.0), top_n: int = 2,
+                     profile_key=None, measured=None, history=None) -> Dict[str,Any]:
+    """compute_pace's combined priority for every row of weight_grid (G × objectives, columns in
+    critical_objectives order; default pace_weight_grid over `levels`) in one batched pass.
+    Returns the per-row scores, how often each waste lands in the top_n ("top_share"), its mean rank,
+    and a tornado: each waste's score range when one objective sweeps `levels` with the others at their default.
+    """
+    prio = templates.get("prioritization", {})
+    obj2w = prio.get("objective_to_waste", {})
+    objs = [o["id"] for o in prio.get("critical_objectives", [])]
+    W = pace_weight_grid(objs, levels) if weight_grid is None else np.asarray(weight_grid, dtype=float).reshape(-1, len(objs))
+
+    present = {}
+    for row in (vc_summary or []):
+        for w, sc in row.get("top3", []):
+            present[w] = present.get(w, 0.0) + float(sc or 0.0)
+    by_waste = (savings or {}).get("by_waste", {})
+    edge = compute_edge_percentiles(templates, profile_key=profile_key, measured=measured, history=history)
+    wastes = sorted(set(present) | set(by_waste) | {w for o in objs for w in obj2w.get(o, {})})
+    ix = {w: j for j, w in enumerate(wastes)}
+    coef = np.zeros((len(objs), len(wastes)))
+    for i, o in enumerate(objs):
+        for w, c in obj2w.get(o, {}).items():
+            coef[i, ix[w]] = float(c)
+
+    def kernel(W):
+        total = np.zeros(W.shape[0])
+        for i in range(len(objs)):
+            total = total + W[:, i]
+        total = np.where(total == 0, 1.0, total)
+        ww = np.zeros((W.shape[0], len(wastes)))
+        for i in range(len(objs)):  # same accumulation order as compute_pace
+            ww = ww + (W[:, i] / total)[:, None] * coef[i]
+        sev = np.array([present.get(w, 0.0) / max(1.0, len(vc_summary or [])) for w in wastes])
+        ben = np.array([math.log10(float(by_waste.get(w, 0.0)) + 10.0) for w in wastes])
+        ed = np.array([edge.get(w, 1.0) for w in wastes])
+        return (sev / 5.0) * (1.0 + ww) * ed * ben
+
+    scores = kernel(W)
+    order = np.argsort(-scores, axis=1, kind="stable")
+    ranks = np.empty_like(order); np.put_along_axis(ranks, order, np.arange(len(wastes))[None, :], axis=1)
+    base = np.array([float(o.get("weight", 1.0)) for o in prio.get("critical_objectives", [])])
+    tornado = {}
+    for i, o in enumerate(objs):
+        sweep = np.repeat(base[None, :], len(levels), axis=0); sweep[:, i] = levels
+        s = kernel(sweep)
+        tornado[o] = {w: (float(s[:, j].min()), float(s[:, j].max())) for j, w in enumerate(wastes)}
+    return {"wastes": wastes, "objectives": objs, "weights": W, "scores": scores,
+            "top_share": {w: float(np.mean(ranks[:, j] < top_n)) for j, w in enumerate(wastes)},
+            "mean_rank": {w: float(ranks[:, j].mean() + 1) for j, w in enumerate(wastes)},
+            "tornado": tornado}
+
+# ---------- Cross-site corpus ----------
+def _vc_stage_vectors(vc_summary, wastes) -> Dict[str, np.ndarray]:
+    """{stage_name: per-waste score vector} from vc_summary top-3 (wastes outside the top 3 count as 0)."""
+    wi = {w: j for j, w in enumerate(wastes)}
+    out = {}
+    for row in (vc_summary or []):
+        v = np.zeros(len(wastes))
+        for w, sc in row.get("top3", []):
+            if w in wi: v[wi[w]] = float(sc or 0.0)
+        out[row.get("stage_name","")] = v
+    return out
+
+def _sorted_percentiles(sorted_cols, valid, x):
+    """Mid-rank percentiles (0-100) of x (m × K) against column-sorted sorted_cols (N × K, NaN last);
+    NaN where the column or the query is empty."""
+    x = np.atleast_2d(np.asarray(x, dtype=float))
+    out = np.full(x.shape, np.nan)
+    for k in range(x.shape[1]):
+        n = int(valid[k])
+        if n == 0: continue
+        col = sorted_cols[:n, k]
+        lo = np.searchsorted(col, x[:, k], side="left"); hi = np.searchsorted(col, x[:, k], side="right")
+        out[:, k] = np.where(np.isnan(x[:, k]), np.nan, (lo + hi) * 50.0 / n)
+    return out
+
+@dataclass(frozen=True)
+class _CorpusIndex:
+    n_sites: int
+    site: Any          # (N, W) presorted per waste
+    steps: Any         # (M, W) presorted per waste
+    stage: Any         # (N, S*W) presorted per column, NaN last
+    stage_valid: Any   # (S*W,)
+
+class AssessmentCorpus:
+    """Past assessments for cross-site comparison: per site the step × waste scores (score_wastes),
+    the site's worst-step score per waste, and the vc_summary stage × waste scores, tagged by profile.
+    Per-profile presorted arrays are built on first query after an add(), so percentiles() is a
+    binary search per column however many sites are stored. Persisted as one .npz file.
+    """
+
+    def __init__(self, wastes=WASTES):
+        self.wastes = tuple(wastes)
+        self.stages: List[str] = []
+        self.site_ids: List[str] = []
+        self.profiles: List[str] = []
+        self._site: List[np.ndarray] = []
+        self._stage: List[Dict[str, np.ndarray]] = []
+        self._steps: List[np.ndarray] = []
+        self._index: Dict[str, _CorpusIndex] = {}
+        self._knn: Dict[str, Tuple[List[int], np.ndarray]] = {}
+
+    def __len__(self):
+        return len(self.site_ids)
+
+    def _step_matrix(self, step_scores) -> np.ndarray:
+        rows = list(step_scores) if not isinstance(step_scores, np.ndarray) else step_scores
+        if isinstance(rows, list) and rows and isinstance(rows[0], Mapping):
+            rows = [[float(r.get(w, 0.0)) for w in self.wastes] for r in rows]
+        return np.asarray(rows, dtype=float).reshape(-1, len(self.wastes))
+
+    def add(self, profile_key, step_scores, vc_summary=None, site_id=None) -> None:
+        """step_scores: (n_steps × len(wastes)) array, or score_wastes()["scores"] dicts."""
+        m = self._step_matrix(step_scores)
+        self._steps.append(m)
+        self._site.append(m.max(axis=0) if m.size else np.zeros(len(self.wastes)))
+        stages = _vc_stage_vectors(vc_summary, self.wastes)
+        for s in stages:
+            if s not in self.stages: self.stages.append(s)
+        self._stage.append(stages)
+        self.site_ids.append(str(site_id if site_id is not None else len(self.site_ids)))
+        self.profiles.append(profile_key or "")
+        self._index.clear(); self._knn.clear()
+
+    def copy(self) -> "AssessmentCorpus":
+        """A corpus that can take add() without changing this one; the stored arrays are shared, never written."""
+        c = AssessmentCorpus(self.wastes)
+        c.stages = list(self.stages); c.site_ids = list(self.site_ids); c.profiles = list(self.profiles)
+        c._site = list(self._site); c._stage = list(self._stage); c._steps = list(self._steps)
+        return c
+
+    def add_assessment(self, profile_key, steps, templates, vc_summary=None, site_id=None) -> None:
+        """add() from ProcessStep rows (or a StepTable), scored with score_wastes_batch."""
+        batch = score_wastes_batch(steps_to_columns(steps), templates.get("thresholds", {}) or {}, templates)
+        self.add(profile_key, batch["scores"][:, [WASTES.index(w) for w in self.wastes]], vc_summary, site_id)
+
+    def sites(self, profile_key=None) -> List[int]:
+        """Row numbers of the sites of a profile (all sites for None)."""
+        return [i for i, p in enumerate(self.profiles) if profile_key is None or p == (profile_key or "")]
+
+    def site_matrix(self, rows=None) -> np.ndarray:
+        """(N, W) worst-step scores followed by (N, S*W) stage scores (NaN = stage not assessed)."""
+        rows = range(len(self)) if rows is None else rows
+        W = len(self.wastes); nan = np.full(W, np.nan)
+        site = np.array([self._site[i] for i in rows]).reshape(-1, W)
+        stage = np.array([np.concatenate([self._stage[i].get(s, nan) for s in self.stages] or [np.empty(0)]) for i in rows]).reshape(len(site), len(self.stages) * W)
+        return np.hstack([site, stage])
+
+    def _build(self, profile_key) -> _CorpusIndex:
+        rows = self.sites(profile_key)
+        W = len(self.wastes)
+        mat = self.site_matrix(rows)
+        steps = np.vstack([self._steps[i] for i in rows] or [np.empty((0, W))])
+        stage = np.sort(mat[:, W:], axis=0)   # NaN sorts last
+        return _CorpusIndex(len(rows), np.sort(mat[:, :W], axis=0), np.sort(steps, axis=0), stage, (~np.isnan(stage)).sum(axis=0))
+
+    def percentiles(self, profile_key, step_scores, vc_summary=None) -> Dict[str,Any]:
+        """Percentile ranks (0-100, higher = more waste than peers) of a new site against the stored sites of
+        profile_key (all sites for None): "wastes" (worst step per waste), "steps" (each step vs all stored
+        steps, n_steps × W array) and "stages" ({stage: {waste: pct}} for stages present in both)."""
+        key = profile_key if profile_key is None else (profile_key or "")
+        idx = self._index.get(key)
+        if idx is None:
+            idx = self._index[key] = self._build(profile_key)
+        W = len(self.wastes)
+        m = self._step_matrix(step_scores)
+        site = m.max(axis=0) if m.size else np.zeros(W)
+        site_pct = _sorted_percentiles(idx.site, np.full(W, idx.n_sites), site)[0]
+        step_pct = _sorted_percentiles(idx.steps, np.full(W, len(idx.steps)), m) if m.size else np.empty((0, W))
+        vecs = _vc_stage_vectors(vc_summary, self.wastes)
+        stages = {}
+        if vecs and self.stages:
+            q = np.concatenate([vecs.get(s, np.full(W, np.nan)) for s in self.stages])
+            pct = _sorted_percentiles(idx.stage, idx.stage_valid, q)[0].reshape(len(self.stages), W)
+            stages = {s: {w: float(pct[i, j]) for j, w in enumerate(self.wastes) if not np.isnan(pct[i, j])}
+                      for i, s in enumerate(self.stages) if s in vecs}
+        return {"n_sites": idx.n_sites, "wastes": {w: float(v) for w, v in zip(self.wastes, site_pct)},
+                "steps": step_pct, "stages": stages}
+
+    def _feature(self, mat) -> np.ndarray:
+        """Unit-length rows of [worst-step wastes | stage × waste scores], unassessed stages as 0."""
+        f = np.nan_to_num(np.atleast_2d(mat), nan=0.0)
+        norm = np.linalg.norm(f, axis=1, keepdims=True)
+        return np.ascontiguousarray(f / np.where(norm == 0, 1.0, norm), dtype=np.float32)  # float32 halves the matvec cost
+
+    def similar(self, step_scores, vc_summary=None, k: int = 5, profile_key=None) -> List[Dict[str,Any]]:
+        """The k stored sites most like a new one by cosine similarity of their waste and stage vectors
+        (restricted to profile_key when given). The normalized site matrix is built once per profile after
+        an add(), so a query is one matrix-vector product plus a partial sort."""
+        key = profile_key if profile_key is None else (profile_key or "")
+        hit = self._knn.get(key)
+        if hit is None:
+            rows = self.sites(profile_key)
+            hit = self._knn[key] = (rows, self._feature(self.site_matrix(rows)))
+        rows, F = hit
+        if not rows:
+            return []
+        W = len(self.wastes)
+        m = self._step_matrix(step_scores)
+        vecs = _vc_stage_vectors(vc_summary, self.wastes)
+        q = np.concatenate([m.max(axis=0) if m.size else np.zeros(W)] + [vecs.get(s, np.zeros(W)) for s in self.stages])
+        sim = F @ self._feature(q)[0]
+        k = min(int(k), len(rows))
+        top = np.argpartition(-sim, k - 1)[:k]
+        top = top[np.argsort(-sim[top], kind="stable")]
+        out = []
+        for j in top:
+            i = rows[j]
+            ranked = sorted(zip(self.wastes, self._site[i].tolist()), key=lambda kv: kv[1], reverse=True)
+            out.append({"site_id": self.site_ids[i], "profile": self.profiles[i], "similarity": float(sim[j]),
+                        "top_wastes": [(w, sc) for w, sc in ranked if sc > 0][:3]})
+        return out
+
+    def save(self, path: str) -> None:
+        W = len(self.wastes)
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        steps = np.vstack(self._steps or [np.empty((0, W))])
+        step_site = np.repeat(np.arange(len(self._steps)), [len(m) for m in self._steps])
+        mat = self.site_matrix()
+        tmp = path + ".tmp.npz"
+        np.savez_compressed(tmp, wastes=np.array(self.wastes), stages=np.array(self.stages, dtype=str),
+                            site_ids=np.array(self.site_ids, dtype=str), profiles=np.array(self.profiles, dtype=str),
+                            site=mat[:, :W], stage=mat[:, W:], steps=steps, step_site=step_site)
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path: str) -> "AssessmentCorpus":
+        with np.load(path, allow_pickle=False) as z:
+            c = cls(wastes=[str(w) for w in z["wastes"]])
+            W = len(c.wastes)
+            c.stages = [str(s) for s in z["stages"]]
+            c.site_ids = [str(s) for s in z["site_ids"]]; c.profiles = [str(p) for p in z["profiles"]]
+            c._site = list(z["site"]); stage = z["stage"].reshape(len(c.site_ids), len(c.stages), W)
+            c._stage = [{s: row[i] for i, s in enumerate(c.stages) if not np.isnan(row[i]).all()} for row in stage]
+            steps, owner = z["steps"], z["step_site"]
+            bounds = np.searchsorted(owner, np.arange(len(c.site_ids) + 1))
+            c._steps = [steps[bounds[i]:bounds[i+1]] for i in range(len(c.site_ids))]
+        return c
+
+CORPUS_PATH = "corpus/assessments.npz"
+_CORPORA: Dict[str, Tuple[Tuple[int, int], AssessmentCorpus]] = {}
+_CORPUS_LOCK = threading.Lock()
+
+def _cached_corpus(path: str) -> AssessmentCorpus:
+    # caller holds _CORPUS_LOCK
+    if not os.path.exists(path):
+        return AssessmentCorpus()
+    st_ = os.stat(path); stamp = (st_.st_mtime_ns, st_.st_size)
+    hit = _CORPORA.get(path)
+    if hit is None or hit[0] != stamp:
+        hit = _CORPORA[path] = (stamp, AssessmentCorpus.load(path))
+    return hit[1]
+
+def load_assessment_corpus(path: str = CORPUS_PATH) -> AssessmentCorpus:
+    """The corpus at path, loaded once per mtime/size and shared across sessions; empty if the file is missing.
+    Shared corpora are never mutated (add_to_corpus swaps in a new one), so readers need no lock."""
+    with _CORPUS_LOCK:
+        return _cached_corpus(path)
+
+def add_to_corpus(profile_key, steps, templates, vc_summary=None, site_id=None, path: str = CORPUS_PATH) -> AssessmentCorpus:
+    """Append one assessment to the corpus file and return the updated corpus. The cached corpus is copied,
+    extended, saved and then swapped into the cache, so sessions querying the old one are unaffected."""
+    with _CORPUS_LOCK:
+        corpus = _cached_corpus(path).copy()
+        corpus.add_assessment(profile_key, steps, templates, vc_summary, site_id)
+        corpus.save(path)
+        st_ = os.stat(path)
+        _CORPORA[path] = ((st_.st_mtime_ns, st_.st_size), corpus)
+    return corpus
+
+def find_similar_factories(step_scores, vc_summary=None, k: int = 5, profile_key=None, corpus: AssessmentCorpus = None) -> List[Dict[str,Any]]:
+    """k nearest stored assessments (see AssessmentCorpus.similar); uses the shared corpus file by default."""
+    return (corpus if corpus is not None else load_assessment_corpus()).similar(step_scores, vc_summary, k=k, profile_key=profile_key)
+
+# ---------- Profile matching ----------
+def match_profiles(templates, measured, history=None, current=None) -> Dict[str,Any]:
+    """Measured KPIs against every templates['profiles'] benchmark set at once (profile × metric matrix).
+    fit = mean |ln(measured / benchmark)| over the metrics the profile defines (lower fits better);
+    edge = compute_edge_percentiles for every profile (equal up to rounding of np.log vs math.log);
+    edge_delta = change vs the `current` profile.
+    """
+    profiles = list((templates.get("profiles") or {}).keys())
+    measured = {k: float(v) for k, v in (measured or {}).items() if v is not None}
+    metrics = sorted(measured)
+    B = np.full((len(profiles), len(metrics)), np.nan)
+    for i, p in enumerate(profiles):
+        bm = templates["profiles"][p].get("benchmarks", {}) or {}
+        for j, m in enumerate(metrics):
+            if bm.get(m) is not None: B[i, j] = float(bm[m])
+    x = np.array([measured[m] for m in metrics])
+    with np.errstate(divide="ignore", invalid="ignore"):
+        dev = np.abs(np.log(np.where(x > 0, x, np.nan)[None, :] / np.where(B > 0, B, np.nan)))
+    n = (~np.isnan(dev)).sum(axis=1)
+    fit = np.where(n > 0, np.nansum(dev, axis=1) / np.maximum(n, 1), np.inf)
+
+    # Edge factors for all profiles: same steps as compute_edge_percentiles, one column per edge metric
+    emet = (templates.get("prioritization", {}) or {}).get("edge_metrics", {}) or {}
+    wastes = list(emet)
+    E = np.ones((len(profiles), len(wastes)))
+    history = history or {}
+    for j, w in enumerate(wastes):
+        key = emet[w].get("key"); hib = bool(emet[w].get("higher_is_better", True))
+        val = measured.get(key)
+        if val is None: continue
+        target = np.array([(templates["profiles"][p].get("benchmarks", {}) or {}).get(key, np.nan) for p in profiles], dtype=float)
+        ratio = (val / target) if hib else (target / max(val, 1e-6))
+        with np.errstate(divide="ignore", invalid="ignore"):
+            f = np.clip(1.0 + np.clip(np.log(np.where(ratio > 0, ratio, 1e-6)), -0.4, 0.4), 0.7, 1.3)
+        n_hist, pr = _history_rank(history.get(key), val)
+        if n_hist >= 5:
+            if not hib: pr = 1.0 - pr
+            f = f * (1.0 + max(0.0, 0.2*(0.5 - pr)))
+        E[:, j] = np.where(np.isnan(target), 1.0, np.clip(f, 0.7, 1.4))
+    order = np.argsort(fit, kind="stable")
+    best = profiles[int(order[0])] if profiles and np.isfinite(fit[order[0]]) else None
+    edge = {p: {w: float(E[i, j]) for j, w in enumerate(wastes)} for i, p in enumerate(profiles)}
+    base = edge.get(current) or {w: 1.0 for w in wastes}
+    return {"profiles": profiles, "metrics": metrics, "ratio": x[None, :] / B, "fit": {p: float(fit[i]) for i, p in enumerate(profiles)},
+            "ranking": [profiles[i] for i in order], "best": best, "edge": edge,
+            "edge_delta": {p: {w: e - base[w] for w, e in ev.items()} for p, ev in edge.items()}}
+
+# ---------- Threshold calibration ----------
+# thresholds key -> the step quantity it scales in score_wastes (columns: ProcessStep numeric fields)
+# Per threshold, the quantity score_wastes scales by threshold/3 (safety_incidents_high: compares with), given the
+# base thresholds. changeover_time_high_min (a plain divisor) and thresholds score_wastes never reads are not calibrated.
+THRESHOLD_DRIVERS = {
+    "defects_pct_high": lambda c, th: c["defect_pct"],
+    "waiting_pct_high": lambda c, th: c["waiting_starved_pct"] + c["downtime_pct"]/2,
+    "inventory_wip_high": lambda c, th: c["wip_units_in"],
+    "transport_distance_high_m": lambda c, th: c["distance_m"] + c["layout_moves"]*10 + c["touchpoints_n"]*5,
+    "rework_pct_high": lambda c, th: c["rework_pct"] + c["changeover_time_min"]/th.get("changeover_time_high_min",30.0),
+    "safety_incidents_high": lambda c, th: c["safety_incidents"],
+    "touchpoints_high": lambda c, th: c["touchpoints_n"],
+}
+_INT_THRESHOLDS = ("safety_incidents_high",)
+
+class ThresholdCalibrator:
+    """Streams historical ProcessStep records and keeps one QuantileSketch per (profile, threshold driver).
+    thresholds() puts each "..._high" at the q-quantile of its driver, so the score_wastes term it scales
+    is 3 of 5 for a step at that quantile of its industry (motion adds its manual/auto bonus on top);
+    safety_incidents_high becomes the incident count from which a step scores 5. Drivers are evaluated
+    against base (e.g. the rework driver uses its changeover_time_high_min), which thresholds() keeps."""
+
+    def __init__(self, k: int = 200, base: Dict[str,Any] = None):
+        self.k = k
+        self.base = dict(base or {})
+        self.sketches: Dict[str, Dict[str, QuantileSketch]] = {}
+
+    def update(self, cols, profile_key) -> None:
+        """Add a block of step columns (dict of arrays, DataFrame or StepTable) for one profile."""
+        if isinstance(cols, StepTable): cols = cols.columns()
+        n = len(cols) if hasattr(cols, "columns") else max((len(v) for v in cols.values()), default=0)
+        c = {f: _num_col(cols, f, n) for f in _NUMERIC_STEP_FIELDS}
+        sk = self.sketches.setdefault(profile_key or "", {})
+        for key, driver in THRESHOLD_DRIVERS.items():
+            sk.setdefault(key, QuantileSketch(k=self.k)).update_many(driver(c, self.base))
+
+    def update_frame(self, df, profile_col: str = "profile", default_profile: str = "") -> None:
+        """Add a DataFrame chunk whose profile_col names each row's profile (all rows default_profile if absent)."""
+        cols = {_kpi_col(c): c for c in df.columns}
+        frame = {f: df[cols[f]] for f in _NUMERIC_STEP_FIELDS if f in cols}
+        if profile_col not in cols:
+            self.update(frame, default_profile); return
+        for prof, idx in df.groupby(df[cols[profile_col]].astype(str).str.strip()).indices.items():
+            self.update({f: v.iloc[idx] for f, v in frame.items()}, prof)
+
+    def thresholds(self, q: float = 0.8, min_count: int = 50) -> Dict[str, Dict[str,Any]]:
+        """{profile: thresholds block}; drivers with fewer than min_count readings or a 0 quantile keep base."""
+        out = {}
+        for prof, sk in self.sketches.items():
+            th = dict(self.base)
+            for key, s in sk.items():
+                if len(s) < min_count: continue
+                v = s.quantile(q)
+                if not v > 0: continue
+                th[key] = max(1, int(math.ceil(v))) if key in _INT_THRESHOLDS else round(float(v), 2)
+            out[prof] = th
+        return out
+
+def calibrate_thresholds(source, templates=None, q: float = 0.8, profile_col: str = "profile", default_profile: str = "",
+                         fmt: str = None, chunksize: int = 100_000, min_count: int = 50) -> Dict[str, Dict[str,Any]]:
+    """Quantile-based thresholds per profile from a CSV/Parquet extract of ProcessStep rows, read in chunks.
+    Columns use the ProcessStep field names plus profile_col; unset thresholds fall back to templates['thresholds']."""
+    cal = ThresholdCalibrator(base=(templates or {}).get("thresholds"))
+    for df in iter_table_chunks(source, set(_NUMERIC_STEP_FIELDS) | {profile_col}, fmt, chunksize):
+        cal.update_frame(df, profile_col, default_profile)
+    return cal.thresholds(q, min_count=min_count)
+
+def profile_thresholds(templates, profile_key=None) -> Dict[str,Any]:
+    """templates['thresholds'] overlaid with profiles[profile_key]['thresholds'] when the profile has its own."""
+    th = templates.get("thresholds", {}) or {}
+    own = ((templates.get("profiles", {}) or {}).get(profile_key or "", {}) or {}).get("thresholds")
+    return {**th, **own} if own else th
+
+def business_case_sweep(vc_summary, templates, vc_followups=None, assumptions=None, grid: Dict[str, Any] = None) -> Dict[str,Any]:
+    """estimate_business_case over every combination of the assumption values in grid
+    ({BUSINESS_CASE_ASSUMPTIONS key: 1-D array}), in one broadcast pass of business_case_kernel.
+    Keys not in grid keep their assumptions value. Returns {"axes": [keys], "values": [arrays],
+    "total": array of shape (len(v) for v in values), "by_waste": {waste: same-shaped array}};
+    every cell equals the scalar estimate_business_case with those assumptions.
+    """
+    assumptions = assumptions or {}
+    grid = {k: np.atleast_1d(np.asarray(v, dtype=float)) for k, v in (grid or {}).items() if k in BUSINESS_CASE_ASSUMPTIONS}
+    axes = list(grid)
+    a = {k: float(assumptions.get(k, d)) for k, d in BUSINESS_CASE_ASSUMPTIONS.items()}
+    for i, k in enumerate(axes):
+        shape = [1] * len(axes); shape[i] = grid[k].size
+        a[k] = grid[k].reshape(shape)
+    arr = business_case_arrays(vc_summary, vc_followups)
+    by_waste, total = business_case_kernel(arr, a)
+    shape = tuple(grid[k].size for k in axes)
+    return {"axes": axes, "values": [grid[k] for k in axes], "total": np.broadcast_to(total, shape),
+            "by_waste": {w: np.broadcast_to(v, shape) for w, v in by_waste.items()}}
@@ -0,0 +1,33 @@
+"""Process pools for the engine and exporters that are safe to start from the Streamlit server."""
+import multiprocessing
+import sys
+import types
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+
+
+@contextmanager
+def _main_masked():
+    """Swap sys.modules['__main__'] for a module without __file__ while workers start.
+    Under `streamlit run` __main__ is app.py, and spawn/forkserver children would re-run it as __mp_main__."""
+    main = sys.modules.get("__main__")
+    if getattr(main, "__file__", None) is None:
+        yield
+        return
+    sys.modules["__main__"] = types.ModuleType("__main__")
+    try:
+        yield
+    finally:
+        sys.modules["__main__"] = main
+
+
+def process_map(fn, items, workers, initializer=None, initargs=()):
+    """fn(item) for every item, in order, computed by a pool of `workers` processes; yields results as they finish.
+    fn, items and initargs must pickle. Workers use forkserver (spawn where unavailable), not fork: the Streamlit
+    server is multi-threaded and a forked child can inherit held locks. Every task is submitted, and so every
+    worker started, while __main__ is masked, so the workers never import the caller's script."""
+    ctx = multiprocessing.get_context("forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn")
+    with ProcessPoolExecutor(max_workers=workers, mp_context=ctx, initializer=initializer, initargs=initargs) as ex:
+        with _main_masked():
+            results = ex.map(fn, items)
+        yield from results
@@ -1,5 +1,12 @@
 
+import gc
+import hashlib
+import io
 import os
+import posixpath
+import re
+import threading
+import zipfile
 from pptx import Presentation
 from pptx.util import Inches, Pt
 from pptx.dml.color import RGBColor
@@ -14,36 +21,184 @@ def t_i18n(key, lang, i18n):
     except Exception:
         return key
 
+# ---------- Brand asset cache ----------
+# Master decks and logos are read once per process (per path, mtime and size). Inside a deck every image is one
+# shared part: python-pptx's add_picture re-reads the file and scans every relationship of the deck for a
+# duplicate on each call, which made the per-slide logo cost grow with deck size.
+_BRAND_MASTERS = {}
+_BRAND_IMAGES = {}
+_BRAND_RGB = {}
+_BRAND_LOCK = threading.Lock()
+
+def _file_stamp(path):
+    st = os.stat(path)
+    return os.path.abspath(path), st.st_mtime_ns, st.st_size
+
+def _cached_asset(cache, path, load):
+    """load(path) memoized in cache per (path, mtime, size); older versions of the same path are dropped."""
+    key = _file_stamp(path)
+    with _BRAND_LOCK:
+        hit = cache.get(key)
+    if hit is None:
+        hit = load(path)
+        with _BRAND_LOCK:
+            for old in [k for k in cache if k[0] == key[0]]:
+                del cache[old]
+            cache[key] = hit
+    return hit
+
+def _read_bytes(path):
+    with open(path, "rb") as f:
+        return f.read()
+
+def _read_image(path):
+    from pptx.parts.image import Image
+    return Image.from_blob(_read_bytes(path), os.path.basename(path))
+
+def _brand_rgb(hex_colour):
+    rgb = _BRAND_RGB.get(hex_colour)
+    if rgb is None:
+        h = hex_colour.lstrip('#')
+        rgb = _BRAND_RGB[hex_colour] = RGBColor(int(h[0:2],16), int(h[2:4],16), int(h[4:6],16))
+    return rgb
+
+def _deck_images(package):
+    """Per-deck image index kept on the package: image parts by path and by sha1, and the /ppt/media/imageN
+    numbers in use (python-pptx walks the whole part graph to find the next free one)."""
+    index = getattr(package, "_kafaa_images", None)
+    if index is None:
+        from pptx.parts.image import ImagePart
+        parts = list(package.iter_parts())
+        index = {"path": {}, "sha1": {p.sha1: p for p in parts if isinstance(p, ImagePart)}, "next": 1,
+                 "used": {p.partname.idx for p in parts if p.partname.startswith("/ppt/media/image") and p.partname.idx is not None}}
+        package._kafaa_images = index
+    return index
+
+def _new_image_part(package, index, image):
+    """ImagePart.new with the same partname python-pptx would pick: the lowest free /ppt/media/imageN."""
+    from pptx.opc.packuri import PackURI
+    from pptx.parts.image import ImagePart
+    n = index["next"]
+    while n in index["used"]:
+        n += 1
+    index["used"].add(n); index["next"] = n + 1
+    return ImagePart(PackURI(f"/ppt/media/image{n}.{image.ext}"), image.content_type, package, image.blob, image.filename)
+
+def _add_shared_picture(slide, path, left, top, width=None, height=None, cached=False):
+    """slide.shapes.add_picture(path, ...) with the image part looked up per deck: the file is read the first time
+    a deck uses it (through the process cache when cached, for brand assets), and identical images share one part
+    as before."""
+    from pptx.opc.constants import RELATIONSHIP_TYPE as RT
+    package = slide.part.package
+    index = _deck_images(package)
+    part = index["path"].get(path)
+    if part is None:
+        image = _cached_asset(_BRAND_IMAGES, path, _read_image) if cached else _read_image(path)
+        part = index["sha1"].get(image.sha1)
+        if part is None:
+            part = index["sha1"][image.sha1] = _new_image_part(package, index, image)
+        index["path"][path] = part
+    rId = slide.part.relate_to(part, RT.IMAGE)
+    return slide.shapes._add_pic_from_image_part(part, rId, left, top, width, height)
+
 def _brand_header(slide, brand_primary="#C00000", logo_path=None):
     try:
         band = slide.shapes.add_shape(MSO_SHAPE.RECTANGLE, Inches(0), Inches(0), Inches(10), Inches(0.18))
         band.fill.solid()
-        h = brand_primary.lstrip('#')
-        band.fill.fore_color.rgb = RGBColor(int(h[0:2],16), int(h[2:4],16), int(h[4:6],16))
+        band.fill.fore_color.rgb = _brand_rgb(brand_primary)
         band.line.fill.background()
-        if logo_path and os.path.exists(logo_path):
-            slide.shapes.add_picture(logo_path, Inches(8.2), Inches(0.2), height=Inches(0.6))
+        if logo_path and (logo_path in _deck_images(slide.part.package)["path"] or os.path.exists(logo_path)):
+            _add_shared_picture(slide, logo_path, Inches(8.2), Inches(0.2), height=Inches(0.6), cached=True)
     except Exception:
         pass
 
 def _load_brand_master_fallback(template_path):
-    """If template_path is None, try to read templates.yaml → brand.pptx_master; else fallback to default Presentation()."""
+    """If template_path is None, try to read templates.yaml → brand.pptx_master; else fallback to default Presentation().
+    The master package is read once per process and each call opens a fresh copy from memory."""
     master_to_use = template_path
     try:
-        import yaml
         if master_to_use is None and os.path.exists('templates.yaml'):
-            with open('templates.yaml','r', encoding='utf-8') as f:
-                tpl = yaml.safe_load(f) or {}
-                master_to_use = (tpl.get('brand',{}) or {}).get('pptx_master')
+            from engine import load_template_bundle
+            tpl = load_template_bundle('templates.yaml').templates
+            master_to_use = (tpl.get('brand',{}) or {}).get('pptx_master')
     except Exception:
         master_to_use = template_path
     try:
         if master_to_use and os.path.exists(master_to_use):
-            return Presentation(master_to_use)
+            return Presentation(io.BytesIO(_cached_asset(_BRAND_MASTERS, master_to_use, _read_bytes)))
         return Presentation()
     except Exception:
         return Presentation()
 
+# ---------- Photo pipeline ----------
+PHOTO_CACHE_DIR = os.path.join("uploads", ".cache")
+PHOTO_SIZES = {"report": 1600, "thumb": 400}  # longest edge in px
+_PHOTO_DIGESTS = {}
+_MAX_PHOTO_DIGESTS = 4096
+_PHOTO_LOCK = threading.Lock()
+
+def photo_digest(path):
+    """sha256 of a photo's content, memoized per (path, mtime, size) so unchanged files are hashed once per process."""
+    st = os.stat(path)
+    key = (os.path.abspath(path), st.st_mtime_ns, st.st_size)
+    with _PHOTO_LOCK:
+        hit = _PHOTO_DIGESTS.get(key)
+    if hit:
+        return hit
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            h.update(block)
+    digest = h.hexdigest()
+    with _PHOTO_LOCK:
+        if len(_PHOTO_DIGESTS) >= _MAX_PHOTO_DIGESTS:
+            _PHOTO_DIGESTS.pop(next(iter(_PHOTO_DIGESTS)))
+        _PHOTO_DIGESTS[key] = digest
+    return digest
+
+def prepare_photo(path, size="report", cache_dir=None):
+    """Path of a copy of the photo upright (EXIF orientation applied) and no larger than PHOTO_SIZES[size] on its
+    longest edge, as JPEG (PNG when it has transparency). Copies live under cache_dir (default PHOTO_CACHE_DIR)
+    keyed by content hash, so each distinct photo is processed once per size whatever it is named or wherever it is
+    uploaded. Returns `path` itself when the file can't be read as an image."""
+    try:
+        digest = photo_digest(path)
+    except OSError:
+        return path
+    folder = os.path.join(cache_dir or PHOTO_CACHE_DIR, digest[:2])
+    for ext in (".jpg", ".png"):
+        cached = os.path.join(folder, f"{digest}-{size}{ext}")
+        if os.path.exists(cached):
+            return cached
+    edge = PHOTO_SIZES[size]
+    tmp = None
+    try:
+        from PIL import Image, ImageOps
+        with Image.open(path) as im:
+            fmt = im.format
+            upright = im.getexif().get(0x0112, 1) == 1  # EXIF orientation
+            alpha = im.mode in ("RGBA", "LA") or (im.mode == "P" and "transparency" in im.info)
+            ext = ".png" if alpha else ".jpg"
+            cached = os.path.join(folder, f"{digest}-{size}{ext}")
+            os.makedirs(folder, exist_ok=True)
+            tmp = f"{cached}.{os.getpid()}.{threading.get_ident()}.tmp"
+            if upright and max(im.size) <= edge and fmt == ("PNG" if alpha else "JPEG"):
+                with open(path, "rb") as src, open(tmp, "wb") as out:
+                    out.write(src.read())
+            else:
+                img = ImageOps.exif_transpose(im)
+                img.thumbnail((edge, edge), Image.LANCZOS)
+                if alpha:
+                    img.save(tmp, format="PNG", optimize=True)
+                else:
+                    img.convert("RGB").save(tmp, format="JPEG", quality=85, optimize=True)
+        os.replace(tmp, cached)
+        return cached
+    except Exception:
+        if tmp and os.path.exists(tmp):
+            os.remove(tmp)
+        return path
+
 def add_material_flow_narrative_slide(prs, text: str, lang='en', i18n=None, brand_primary="#C00000", logo_path=None):
     slide = prs.slides.add_slide(prs.slide_layouts[5])
     _brand_header(slide, brand_primary, logo_path)
@@ -55,8 +210,166 @@ def add_material_flow_narrative_slide(prs, text: str, lang='en', i18n=None, bran
     tf.text = text
     tf.paragraphs[0].font.size = Pt(12)
 
-def export_observations_pptx(observations_df, out_path, steps=None, perstep_top2=None, spacing_mode="Effective CT", ct_eff_map=None, vc_summary=None, material_flow_text=None, photos=None, template_path=None, lang='en', i18n=None, brand_primary="#C00000", logo_path=None, finance=None, product_df=None, champion=None, savings=None):
-    prs = _load_brand_master_fallback(template_path)
+_CT_NS = "http://schemas.openxmlformats.org/package/2006/content-types"
+_REL_NS = "http://schemas.openxmlformats.org/package/2006/relationships"
+_P_NS = "http://schemas.openxmlformats.org/presentationml/2006/main"
+_R_NS = "http://schemas.openxmlformats.org/officeDocument/2006/relationships"
+_SLIDE_RT = _R_NS + "/slide"
+_SLIDE_CT = "application/vnd.openxmlformats-officedocument.presentationml.slide+xml"
+
+def _xml_bytes(el):
+    from lxml import etree
+    return etree.tostring(el, encoding="UTF-8", standalone=True)
+
+def _slide_parts(z, skip=0):
+    """Part names of the slides of an open pptx zip, in deck order, after the first `skip`."""
+    from lxml import etree
+    pres = etree.fromstring(z.read("ppt/presentation.xml"))
+    rels = etree.fromstring(z.read("ppt/_rels/presentation.xml.rels"))
+    targets = {r.get("Id"): r.get("Target") for r in rels.iter(f"{{{_REL_NS}}}Relationship")}
+    ids = [s.get(f"{{{_R_NS}}}id") for s in pres.iter(f"{{{_P_NS}}}sldId")]
+    return [posixpath.normpath(posixpath.join("ppt", targets[i])) for i in ids][skip:]
+
+def _rels_name(part):
+    return posixpath.join(posixpath.dirname(part), "_rels", posixpath.basename(part) + ".rels")
+
+def _pictures(sld):
+    """(embedded image rId, cNvPr element) for every picture on a slide."""
+    out = []
+    for pic in sld.iter(f"{{{_P_NS}}}pic"):
+        blip = pic.find(".//{http://schemas.openxmlformats.org/drawingml/2006/main}blip")
+        cnv = pic.find(f"{{{_P_NS}}}nvPicPr/{{{_P_NS}}}cNvPr")
+        if blip is not None and cnv is not None:
+            out.append((blip.get(f"{{{_R_NS}}}embed"), cnv))
+    return out
+
+class _DeckStream:
+    """Writes a pptx to out_path part by part: the parts of a base deck first, then slides appended from decks
+    built on the same master. Layout relationships are kept, media is renamed and deduplicated by content;
+    slide XML is copied as is. The package index (content types, presentation, its rels) goes last."""
+    def __init__(self, base_blob, out_path):
+        from lxml import etree
+        self.out_path = out_path
+        self._zip = zipfile.ZipFile(out_path, "w", zipfile.ZIP_DEFLATED)
+        held = ("[Content_Types].xml", "ppt/presentation.xml", "ppt/_rels/presentation.xml.rels")
+        with zipfile.ZipFile(io.BytesIO(base_blob)) as src:
+            self._ct = etree.fromstring(src.read(held[0]))
+            self._pres = etree.fromstring(src.read(held[1]))
+            self._rels = etree.fromstring(src.read(held[2]))
+            self._names = set(src.namelist())
+            self._media, self._descr = {}, {}
+            digests = {}
+            for name in src.namelist():
+                if name in held:
+                    continue
+                blob = src.read(name)
+                self._zip.writestr(name, blob)
+                if name.startswith("ppt/media/"):
+                    digests[name] = hashlib.sha1(blob).hexdigest()
+                    self._media.setdefault(digests[name], name)
+            for part in _slide_parts(src):
+                targets = self._media_targets(part, etree.fromstring(src.read(_rels_name(part))))
+                for rid, pic in _pictures(etree.fromstring(src.read(part))):
+                    if rid in targets:
+                        self._descr.setdefault(digests[targets[rid]], pic.get("descr"))
+        self._slide_no = max([int(m.group(1)) for m in (re.fullmatch(r"ppt/slides/slide(\d+)\.xml", n) for n in self._names) if m] or [0])
+        self._defaults = {d.get("Extension").lower(): d.get("ContentType") for d in self._ct.iter(f"{{{_CT_NS}}}Default")}
+        self._lst = self._pres.find(f"{{{_P_NS}}}sldIdLst")
+        if self._lst is None:
+            self._lst = etree.Element(f"{{{_P_NS}}}sldIdLst")
+            anchor = [c for c in self._pres if etree.QName(c).localname in ("sldMasterIdLst", "notesMasterIdLst", "handoutMasterIdLst")]
+            anchor[-1].addnext(self._lst)
+        self._next_id = max([int(s.get("id")) for s in self._lst] + [255]) + 1
+        self._next_rid = max([int(r.get("Id")[3:]) for r in self._rels if r.get("Id", "").startswith("rId") and r.get("Id")[3:].isdigit()] + [0]) + 1
+
+    @staticmethod
+    def _media_targets(part, rels):
+        out = {}
+        for r in rels:
+            if r.get("TargetMode") != "External":
+                target = posixpath.normpath(posixpath.join(posixpath.dirname(part), r.get("Target")))
+                if target.startswith("ppt/media/"):
+                    out[r.get("Id")] = target
+        return out
+
+    def _content_type(self, src_ct, name):
+        for o in src_ct.iter(f"{{{_CT_NS}}}Override"):
+            if o.get("PartName") == "/" + name:
+                return o.get("ContentType")
+        ext = name.rsplit(".", 1)[-1].lower()
+        return {d.get("Extension").lower(): d.get("ContentType") for d in src_ct.iter(f"{{{_CT_NS}}}Default")}.get(ext)
+
+    def _add_media(self, blob, ext, ctype):
+        digest = hashlib.sha1(blob).hexdigest()
+        if digest in self._media:
+            return self._media[digest]
+        n = len(self._media) + 1
+        while f"ppt/media/image{n}.{ext}" in self._names:
+            n += 1
+        name = f"ppt/media/image{n}.{ext}"
+        # images are already compressed; storing them skips a second deflate pass
+        self._zip.writestr(name, blob, compress_type=zipfile.ZIP_STORED); self._names.add(name); self._media[digest] = name
+        if self._defaults.get(ext.lower()) != ctype:
+            from lxml import etree
+            if ext.lower() in self._defaults:
+                etree.SubElement(self._ct, f"{{{_CT_NS}}}Override", PartName="/" + name, ContentType=ctype)
+            else:
+                etree.SubElement(self._ct, f"{{{_CT_NS}}}Default", Extension=ext, ContentType=ctype)
+                self._defaults[ext.lower()] = ctype
+        return name
+
+    def append(self, deck_blob, skip=0):
+        """Appends the slides of deck_blob after its first `skip` (slides the master itself carries)."""
+        from lxml import etree
+        with zipfile.ZipFile(io.BytesIO(deck_blob)) as src:
+            src_ct = etree.fromstring(src.read("[Content_Types].xml"))
+            for part in _slide_parts(src, skip):
+                rels = etree.fromstring(src.read(_rels_name(part)))
+                digests = {}
+                for r in rels:
+                    if r.get("TargetMode") == "External":
+                        continue
+                    target = posixpath.normpath(posixpath.join(posixpath.dirname(part), r.get("Target")))
+                    if target.startswith("ppt/media/"):
+                        blob = src.read(target)
+                        digests[r.get("Id")] = hashlib.sha1(blob).hexdigest()
+                        name = self._add_media(blob, target.rsplit(".", 1)[-1], self._content_type(src_ct, target))
+                        r.set("Target", "../media/" + posixpath.basename(name))
+                    elif not (target.startswith("ppt/slideLayouts/") and target in self._names):
+                        raise ValueError(f"cannot stream slide relationship to {target}")
+                # A single deck names a picture after the first file its image was loaded from; keep that across chunks.
+                xml = src.read(part)
+                sld, changed = etree.fromstring(xml), False
+                for rid, pic in _pictures(sld):
+                    if rid in digests:
+                        first = self._descr.setdefault(digests[rid], pic.get("descr"))
+                        if pic.get("descr") != first:
+                            pic.set("descr", first); changed = True
+                self._slide_no += 1
+                name = f"ppt/slides/slide{self._slide_no}.xml"
+                self._zip.writestr(name, _xml_bytes(sld) if changed else xml)
+                self._zip.writestr(f"ppt/slides/_rels/slide{self._slide_no}.xml.rels", _xml_bytes(rels))
+                self._names.add(name)
+                etree.SubElement(self._ct, f"{{{_CT_NS}}}Override", PartName="/" + name, ContentType=_SLIDE_CT)
+                rid = f"rId{self._next_rid}"; self._next_rid += 1
+                etree.SubElement(self._rels, f"{{{_REL_NS}}}Relationship", Id=rid, Type=_SLIDE_RT, Target=f"slides/slide{self._slide_no}.xml")
+                sld = etree.SubElement(self._lst, f"{{{_P_NS}}}sldId", id=str(self._next_id))
+                sld.set(f"{{{_R_NS}}}id", rid); self._next_id += 1
+
+    def close(self):
+        self._zip.writestr("[Content_Types].xml", _xml_bytes(self._ct))
+        self._zip.writestr("ppt/presentation.xml", _xml_bytes(self._pres))
+        self._zip.writestr("ppt/_rels/presentation.xml.rels", _xml_bytes(self._rels))
+        self._zip.close()
+
+    def abort(self):
+        self._zip.close()
+        try:
+            os.remove(self.out_path)
+        except OSError:
+            pass
+
+def _add_title_slide(prs, lang='en', i18n=None, brand_primary="#C00000", logo_path=None):
     title = prs.slides.add_slide(prs.slide_layouts[0])
     _brand_header(title, brand_primary, logo_path)
     if title.shapes.title:
@@ -67,30 +380,7 @@ def export_observations_pptx(observations_df, out_path, steps=None, perstep_top2
         except Exception:
             pass
 
-    if steps and perstep_top2:
-        add_current_state_map_slide(prs, steps, perstep_top2, spacing_mode=spacing_mode, ct_eff_map=ct_eff_map or {}, lang=lang, i18n=i18n, brand_primary=brand_primary, logo_path=logo_path)
-    if vc_summary:
-        add_value_chain_slide(prs, vc_summary, lang=lang, i18n=i18n, brand_primary=brand_primary, logo_path=logo_path)
-    if material_flow_text:
-        add_material_flow_narrative_slide(prs, material_flow_text, lang=lang, i18n=i18n, brand_primary=brand_primary, logo_path=logo_path)
-    if finance:
-        try:
-            add_financial_slide(prs, finance, brand_primary=brand_primary, logo_path=logo_path)
-        except Exception:
-            pass
-    if product_df is not None and champion is not None:
-        try:
-            add_product_selection_slide(prs, product_df, champion, brand_primary=brand_primary, logo_path=logo_path)
-        except Exception:
-            pass
-    if savings:
-        try:
-            add_business_case_slide(prs, savings, brand_primary=brand_primary, logo_path=logo_path)
-        except Exception:
-            pass
-
-    add_pqcdsm_slides(prs, observations_df, lang=lang, i18n=i18n, brand_primary=brand_primary, logo_path=logo_path)
-
+def _add_summary_slide(prs, observations_df, lang='en', i18n=None, brand_primary="#C00000", logo_path=None):
     slide = prs.slides.add_slide(prs.slide_layouts[5])
     _brand_header(slide, brand_primary, logo_path)
     tx = slide.shapes.add_textbox(Inches(0.5), Inches(0.3), Inches(9), Inches(1))
@@ -104,6 +394,109 @@ def export_observations_pptx(observations_df, out_path, steps=None, perstep_top2
         p.font.size = Pt(14)
         y += 0.6
 
+def _try_section(prs, section, **kw):
+    try:
+        section(prs, **kw)
+    except Exception:
+        pass
+
+def _observation_sections(observations_df, chunk_size=None, steps=None, perstep_top2=None, spacing_mode="Effective CT", ct_eff_map=None, vc_summary=None, material_flow_text=None, photos=None, lang='en', i18n=None, brand_primary="#C00000", logo_path=None, finance=None, product_df=None, champion=None, savings=None, photo_size="report"):
+    """(function, kwargs, observation rows done) per section of the observations deck, in deck order;
+    detail slides are split into sections of chunk_size rows. Each function is called as function(prs, **kwargs)."""
+    brand = dict(brand_primary=brand_primary, logo_path=logo_path)
+    text = dict(lang=lang, i18n=i18n, **brand)
+    out = [(_add_title_slide, text, 0)]
+    if steps and perstep_top2:
+        out.append((add_current_state_map_slide, dict(steps=steps, perstep_top2=perstep_top2, spacing_mode=spacing_mode, ct_eff_map=ct_eff_map or {}, **text), 0))
+    if vc_summary:
+        out.append((add_value_chain_slide, dict(vc_summary=vc_summary, **text), 0))
+    if material_flow_text:
+        out.append((add_material_flow_narrative_slide, dict(text=material_flow_text, **text), 0))
+    if finance:
+        out.append((_try_section, dict(section=add_financial_slide, finance=finance, **brand), 0))
+    if product_df is not None and champion is not None:
+        out.append((_try_section, dict(section=add_product_selection_slide, df=product_df, champion=champion, **brand), 0))
+    if savings:
+        out.append((_try_section, dict(section=add_business_case_slide, savings=savings, **brand), 0))
+    out.append((add_pqcdsm_slides, dict(observations_df=observations_df, **text), 0))
+    out.append((_add_summary_slide, dict(observations_df=observations_df, **text), 0))
+    n = len(observations_df)
+    step = int(chunk_size or 0) or max(n, 1)
+    for start in range(0, n, step):
+        out.append((add_observation_detail_slides, dict(observations_df=observations_df.iloc[start:start + step], photos=photos, photo_size=photo_size, **brand), min(start + step, n)))
+    return out
+
+def _render_section(template_path, section, kw):
+    """One section rendered into its own deck on the master: (pptx bytes, slides the master already had)."""
+    prs = _load_brand_master_fallback(template_path)
+    skip = len(prs.slides)
+    section(prs, **kw)
+    buf = io.BytesIO(); prs.save(buf)
+    return buf.getvalue(), skip
+
+def _render_section_args(args):
+    return _render_section(*args)
+
+def _render_worker_init(photo_cache_dir):
+    global PHOTO_CACHE_DIR
+    PHOTO_CACHE_DIR = photo_cache_dir
+
+def export_observations_pptx(observations_df, out_path, steps=None, perstep_top2=None, spacing_mode="Effective CT", ct_eff_map=None, vc_summary=None, material_flow_text=None, photos=None, template_path=None, lang='en', i18n=None, brand_primary="#C00000", logo_path=None, finance=None, product_df=None, champion=None, savings=None, chunk_size=None, progress=None, workers=None, photo_size="report"):
+    """chunk_size streams detail slides to out_path in chunks of that many rows (same deck, bounded memory);
+    workers > 1 renders the sections (and detail chunks, 50 rows by default) in that many processes and merges
+    their slides into one deck in order. progress(done, total) is called with observation rows written.
+    Photos go in downscaled to photo_size (see prepare_photo); None embeds the original files."""
+    n = len(observations_df)
+    workers = int(workers or 1)
+    sections = _observation_sections(observations_df, chunk_size=chunk_size or (50 if workers > 1 else None), steps=steps, perstep_top2=perstep_top2,
+                                     spacing_mode=spacing_mode, ct_eff_map=ct_eff_map, vc_summary=vc_summary, material_flow_text=material_flow_text,
+                                     photos=photos, lang=lang, i18n=i18n, brand_primary=brand_primary, logo_path=logo_path,
+                                     finance=finance, product_df=product_df, champion=champion, savings=savings, photo_size=photo_size)
+    prs = _load_brand_master_fallback(template_path)
+    if not chunk_size and workers <= 1:
+        for section, kw, _ in sections:
+            section(prs, **kw)
+        prs.save(out_path)
+        if progress:
+            progress(n, n)
+        return out_path
+
+    # Front sections go into the base deck (only the title slide when rendering in parallel), which is written to
+    # out_path part by part; every later section is rendered into a throwaway deck on the same master and its slides
+    # appended, so only one chunk of photos is held at once.
+    head = 1 if workers > 1 else next((i for i, (_, _, rows) in enumerate(sections) if rows), len(sections))
+    for section, kw, _ in sections[:head]:
+        section(prs, **kw)
+    buf = io.BytesIO(); prs.save(buf); prs = None
+    deck = _DeckStream(buf.getvalue(), out_path); buf = None
+    rest = sections[head:]
+    try:
+        if workers > 1:
+            from pools import process_map
+            rendered = process_map(_render_section_args, [(template_path, section, kw) for section, kw, _ in rest],
+                                   min(workers, len(rest)), initializer=_render_worker_init, initargs=(PHOTO_CACHE_DIR,))
+            try:
+                for (blob, skip), (_, _, rows) in zip(rendered, rest):
+                    deck.append(blob, skip=skip)
+                    if progress and rows:
+                        progress(rows, n)
+            finally:
+                rendered.close()  # shuts the pool down now if appending failed
+        else:
+            for section, kw, rows in rest:
+                blob, skip = _render_section(template_path, section, kw)
+                deck.append(blob, skip=skip); blob = None
+                gc.collect()
+                if progress and rows:
+                    progress(rows, n)
+    except BaseException:
+        deck.abort()
+        raise
+    deck.close()
+    return out_path
+
+def add_observation_detail_slides(prs, observations_df, photos=None, brand_primary="#C00000", logo_path=None, photo_size="report"):
+    """One slide per observation row, with up to two evidence photos prepared at photo_size (None: original files)."""
     for _, row in observations_df.iterrows():
         s = prs.slides.add_slide(prs.slide_layouts[5])
         _brand_header(s, brand_primary, logo_path)
@@ -124,13 +517,10 @@ def export_observations_pptx(observations_df, out_path, steps=None, perstep_top2
                 px = Inches(7.2); py = Inches(2.0); ph = Inches(1.9)
                 for i, fp in enumerate(files):
                     if os.path.exists(fp):
-                        s.shapes.add_picture(fp, px, py + Inches(i*2.1), height=ph)
+                        _add_shared_picture(s, prepare_photo(fp, photo_size) if photo_size else fp, px, py + Inches(i*2.1), height=ph)
         except Exception:
             pass
 
-    prs.save(out_path)
-    return out_path
-
 def add_pqcdsm_slides(prs, observations_df, lang='en', i18n=None, brand_primary="#C00000", logo_path=None):
     theme_order = [("P","Production"),("Q","Quality"),("C","Cost"),("D","Delivery"),("S","Safety"),("M","Morale")]
     if "theme_code" not in observations_df.columns:
@@ -222,27 +612,65 @@ def add_value_chain_slide(prs, vc_summary, lang='en', i18n=None, brand_primary="
                 q = tf2.add_paragraph(); q.text = f"– {iss}"; q.font.size=Pt(9); q.level=2
         x = x + w + gap
 
+_PDF_LOGOS = {}
+_PDF_LOCK = threading.Lock()
+PDF_LOGO_EDGE = 1200  # px; the watermark spans half an A4 page, ~150 dpi at this size
+
+def _pdf_logo(logo_path):
+    """ImageReader for logo_path scaled to PDF_LOGO_EDGE, decoded once per process (per path and mtime);
+    None when there is no logo."""
+    if not (logo_path and os.path.exists(logo_path)):
+        return None
+    key = (os.path.abspath(logo_path), os.stat(logo_path).st_mtime_ns)
+    with _PDF_LOCK:
+        if key not in _PDF_LOGOS:
+            from PIL import Image
+            from reportlab.lib.utils import ImageReader
+            with Image.open(logo_path) as im:
+                im.load()
+                im.thumbnail((PDF_LOGO_EDGE, PDF_LOGO_EDGE), Image.LANCZOS)
+                _PDF_LOGOS[key] = ImageReader(im.copy())
+        return _PDF_LOGOS[key]
+
+def _watermark_form(c, w, h, logo_path, name="kafaa_watermark"):
+    """Draws the rotated logo watermark once into a form XObject of canvas c (see _draw_watermark).
+    Returns the form name, or None when there is no logo or it can't be drawn."""
+    try:
+        img = _pdf_logo(logo_path)
+        if img is None:
+            return None
+        c.beginForm(name)
+        c.saveState()
+        c.translate(w * 0.5, h * 0.35)
+        c.rotate(25)
+        c.drawImage(img, -w*0.25, -h*0.15, width=w*0.5, height=h*0.3, preserveAspectRatio=True, mask='auto')
+        c.restoreState()
+        c.endForm()
+        return name
+    except Exception:
+        return None
+
+def _draw_watermark(c, form):
+    """Places the watermark form on the current page. The transparency is set on the page, not in the form:
+    reportlab forms carry no ExtGState resources, and the form inherits the page's fill alpha."""
+    if not form:
+        return
+    c.saveState()
+    try:
+        c.setFillAlpha(0.08)  # available in reportlab 4.x
+    except Exception:
+        pass
+    c.doForm(form)
+    c.restoreState()
+
 def export_observations_pdf(observations_df, out_path, brand_primary="#C00000", logo_path="assets/kafaa_logo.png"):
     c = canvas.Canvas(out_path, pagesize=landscape(A4))
     w, h = landscape(A4)
 
-    # Watermark function
+    # Watermark: drawn once as a form, referenced from every page
+    form = _watermark_form(c, w, h, logo_path)
     def _watermark():
-        try:
-            from reportlab.lib.utils import ImageReader
-            c.saveState()
-            c.translate(w * 0.5, h * 0.35)
-            c.rotate(25)
-            try:
-                c.setFillAlpha(0.08)  # available in reportlab 4.x
-            except Exception:
-                pass
-            img = ImageReader(logo_path) if (logo_path and os.path.exists(logo_path)) else None
-            if img:
-                c.drawImage(img, -w*0.25, -h*0.15, width=w*0.5, height=h*0.3, preserveAspectRatio=True, mask='auto')
-            c.restoreState()
-        except Exception:
-            pass
+        _draw_watermark(c, form)
 
     _watermark()
     c.setFont("Helvetica-Bold", 20); c.drawString(2*cm, h-1.5*cm, "Automated VSM – Observations")
@@ -354,24 +782,13 @@ def export_charter_pdf(charter: dict, out_path, brand_primary="#C00000", logo_pa
     from reportlab.lib.pagesizes import A4, landscape
     from reportlab.pdfgen import canvas
     from reportlab.lib.units import cm
-    from reportlab.lib.utils import ImageReader
-    import os
 
     c = canvas.Canvas(out_path, pagesize=landscape(A4))
     w, h = landscape(A4)
 
+    form = _watermark_form(c, w, h, logo_path)
     def _watermark():
-        try:
-            c.saveState(); c.translate(w*0.5, h*0.35); c.rotate(25)
-            try:
-                c.setFillAlpha(0.08)
-            except Exception:
-                pass
-            if logo_path and os.path.exists(logo_path):
-                c.drawImage(ImageReader(logo_path), -w*0.25, -h*0.15, width=w*0.5, height=h*0.3, preserveAspectRatio=True, mask='auto')
-            c.restoreState()
-        except Exception:
-            pass
+        _draw_watermark(c, form)
 
     def _section(title, y):
         c.setFillColorRGB(0,0,0); c.setFont("Helvetica-Bold", 14); c.drawString(1.5*cm, y, title)